@@ -2,9 +2,46 @@
 
 from .sensor_wrapper import AudioSensorWrapper, CameraSensorWrapper
 from .adaptive_fusion import AdaptiveFusion
+from .audio_stream import AudioRingBuffer
+from .audio_doa import GccPhatEngine
+from .imu_sampler import YawSampler
+from .noise_floor import NoiseFloor
+from .gap import Gap, GapBatch
+from .gap_tracker import GapTracker
+from .detect_scheduler import DetectionScheduler
+from .frame_grabber import FrameGrabber
+from .broadcast import FrameBroadcaster
+from .sensor_record import SessionRecorder, SessionReader
+from .metrics import MetricsRegistry
+from .logger import configure_logging, get_logger
+from .pipeline import LatestValue, FusionStage
+from .drive_controller import DriveController
+from .telemetry import DistanceRing
+from .shm_ring import SharedFrameRing, SharedRecord
 
 __all__ = [
     'AudioSensorWrapper',
     'CameraSensorWrapper',
-    'AdaptiveFusion'
+    'AdaptiveFusion',
+    'AudioRingBuffer',
+    'GccPhatEngine',
+    'YawSampler',
+    'NoiseFloor',
+    'Gap',
+    'GapBatch',
+    'GapTracker',
+    'DetectionScheduler',
+    'FrameGrabber',
+    'FrameBroadcaster',
+    'SessionRecorder',
+    'SessionReader',
+    'MetricsRegistry',
+    'configure_logging',
+    'get_logger',
+    'LatestValue',
+    'FusionStage',
+    'DriveController',
+    'DistanceRing',
+    'SharedFrameRing',
+    'SharedRecord'
 ]
@@ -1,11 +1,37 @@
 # fusion/adaptive_fusion.py
 
+import time
+import logging
+import numpy as np
+
+from .gap import GapBatch
+
+log = logging.getLogger(__name__)
+
+
 class AdaptiveFusion:
     """2센서 적응형 융합"""
 
-    def __init__(self):
+    def __init__(self, max_audio_age=0.5, audio_fade_age=0.2, max_gap_age=0.5,
+                 stop_distance=20.0, slow_distance=60.0, max_distance_age=0.3,
+                 stale_distance_scale=0.5):
         self.snr_threshold = 15.0
 
+        # 입력 유효 시간 (초, monotonic 기준)
+        # 음향: audio_fade_age까지 전체 가중치 → max_audio_age에서 0 (이후 버림)
+        # 틈: max_gap_age보다 오래되면 융합하지 않음
+        self.max_audio_age = max_audio_age
+        self.audio_fade_age = audio_fade_age
+        self.max_gap_age = max_gap_age
+
+        # 초음파 거리 (cm): slow_distance부터 감속 → stop_distance에서 정지
+        # (펌웨어 강제 정지 DISTANCE_THRESHOLD=15cm보다 먼저)
+        self.stop_distance = stop_distance
+        self.slow_distance = slow_distance
+        self.max_distance_age = max_distance_age
+        # 거리 측정이 끊기거나 오래되면 제한을 풀지 않고 이 배율로 감속
+        self.stale_distance_scale = stale_distance_scale
+
         self.weights_audio_trust = {
             'audio': 0.70,
             'gap': 0.30
@@ -16,69 +42,178 @@ class AdaptiveFusion:
             'gap': 0.50
         }
 
-    def fuse(self, audio_data, gaps):
-        """융합 실행"""
-        if not gaps or not audio_data:
+    def select_mode(self, snr):
+        """SNR로 모드와 가중치 결정"""
+        if snr >= self.snr_threshold:
+            return "audio_trust", self.weights_audio_trust
+        return "visual_trust", self.weights_visual_trust
+
+    def audio_freshness(self, age):
+        """음향 나이(초) → 가중치 배율 (0 = 버림)"""
+        if age is None or age <= self.audio_fade_age:
+            return 1.0
+        if age >= self.max_audio_age:
+            return 0.0
+        return (self.max_audio_age - age) / (self.max_audio_age - self.audio_fade_age)
+
+    def speed_scale(self, distance_cm):
+        """전방 거리 → 속도 배율 (0 = 정지, 1 = 제한 없음)"""
+        if distance_cm >= self.slow_distance:
+            return 1.0
+        if distance_cm <= self.stop_distance:
+            return 0.0
+        return (distance_cm - self.stop_distance) / (self.slow_distance - self.stop_distance)
+
+    def fuse_arrays(self, audio_angle, audio_snr, angles, widths, confidences,
+                    audio_freshness=1.0):
+        """열 배열(각도, 폭, 신뢰도) 기반 융합 - 한 번의 NumPy 연산으로 점수 계산
+
+        audio_freshness(0~1)만큼 음향 가중치를 줄이고 나머지는 틈에 준다.
+        반환: best_index, mode, score 와 틈별 점수 배열
+        """
+        angles = np.asarray(angles, dtype=np.float64)
+        if angles.size == 0:
             return None
 
-        # 모드 판단
-        if audio_data['snr'] >= self.snr_threshold:
-            mode = "audio_trust"
-            weights = self.weights_audio_trust
-        else:
-            mode = "visual_trust"
-            weights = self.weights_visual_trust
+        mode, weights = self.select_mode(audio_snr)
+        if audio_freshness < 1.0:
+            if audio_freshness <= 0.0:
+                mode = "visual_only"
+            audio_weight = weights['audio'] * max(audio_freshness, 0.0)
+            weights = {'audio': audio_weight, 'gap': 1.0 - audio_weight}
 
-        print(f"\n{'='*60}")
-        print(f"🎯 모드: {mode}")
-        print(f"   SNR: {audio_data['snr']:.1f}dB")
-        print(f"   가중치: 음향 {weights['audio']:.0%} + 틈 {weights['gap']:.0%}")
-        print(f"{'='*60}")
+        # 음향 점수 (각도 차이는 360° 래핑)
+        angle_diff = np.abs(angles - audio_angle)
+        angle_diff = np.where(angle_diff > 180, 360 - angle_diff, angle_diff)
 
-        # 점수 계산
-        gap_scores = []
+        snr_factor = min(1.0, max(0.5, audio_snr / 30.0))
+        audio_scores = np.maximum(0.0, 1.0 - angle_diff / 90.0) * snr_factor
 
-        for i, gap in enumerate(gaps):
-            # 음향 점수
-            angle_diff = abs(gap['angle'] - audio_data['angle'])
-            if angle_diff > 180:
-                angle_diff = 360 - angle_diff
-
-            audio_score = max(0, 1.0 - (angle_diff / 90.0))
-            snr_factor = min(1.0, max(0.5, audio_data['snr'] / 30.0))
-            audio_score *= snr_factor
-
-            # 틈 점수
-            size_score = min(1.0, gap['width'] / 300.0)
-            gap_score = (size_score + gap['confidence']) / 2.0
-
-            # 최종 점수
-            total_score = (
-                audio_score * weights['audio'] +
-                gap_score * weights['gap']
-            )
-
-            gap_scores.append({
-                'gap': gap,
-                'audio_score': audio_score,
-                'gap_score': gap_score,
-                'total_score': total_score
-            })
-
-            print(f"\n틈 #{i} (각도 {gap['angle']:+.1f}°):")
-            print(f"  음향: {audio_score:.2f}")
-            print(f"  틈:   {gap_score:.2f}")
-            print(f"  → 최종: {total_score:.2f}")
-
-        # 최고 점수 선택
-        gap_scores.sort(key=lambda x: x['total_score'], reverse=True)
-        best = gap_scores[0]
-
-        print(f"\n✅ 선택: 틈 #{gaps.index(best['gap'])}")
+        # 틈 점수
+        size_scores = np.minimum(1.0, np.asarray(widths, dtype=np.float64) / 300.0)
+        gap_scores = (size_scores + np.asarray(confidences, dtype=np.float64)) / 2.0
+
+        # 최종 점수
+        total_scores = audio_scores * weights['audio'] + gap_scores * weights['gap']
+        best_index = int(np.argmax(total_scores))
 
         return {
-            'best_gap': best['gap'],
+            'best_index': best_index,
             'mode': mode,
-            'score': best['total_score'],
-            'all_scores': gap_scores
+            'weights': weights,
+            'score': float(total_scores[best_index]),
+            'audio_scores': audio_scores,
+            'gap_scores': gap_scores,
+            'total_scores': total_scores
+        }
+
+    def fuse(self, audio_data, gaps, with_scores=True, now=None, distance=None):
+        """융합 실행
+
+        gaps는 GapBatch 또는 틈(dict/Gap) 리스트. with_scores=False면
+        all_scores 목록을 만들지 않는다 (고속 루프용)
+
+        audio_data['time'], gaps.timestamp(monotonic)가 있으면 now 기준 나이를 따져
+        오래된 틈은 거부(None), 오래된 음향은 가중치를 줄이거나 버린다.
+        틈 나이는 실제 측정 시각(추적기 예측이면 measured_time) 기준이다.
+        시각이 없는 입력은 방금 들어온 것으로 본다.
+        음향이 아예 없으면(조용한 곳) 오래된 음향과 같이 visual_only로 융합한다.
+
+        distance: 초음파 최신 측정 (DistanceRing.latest()). 유효하면 결과에
+        speed_scale(감속 배율)을 넣는다. None이면 초음파를 쓰지 않는 구성으로 보고
+        제한이 없으며, 빈 dict(아직 측정 없음)나 오래된 측정이면
+        stale_distance_scale로 감속하고 distance_stale=True로 알린다.
+        """
+        if not gaps:
+            return None
+
+        if now is None:
+            now = time.monotonic()
+        audio_time = audio_data.get('time') if audio_data else None
+        gap_time = getattr(gaps, 'timestamp', None)
+        measured_time = getattr(gaps, 'measurement_time', None)
+        audio_age = now - audio_time if audio_time is not None else None
+        gap_age = now - measured_time if measured_time is not None else None
+
+        if gap_age is not None and gap_age > self.max_gap_age:
+            log.debug("틈 정보가 오래됨 (%.0fms) → 융합 생략", gap_age * 1000)
+            return None
+
+        if isinstance(gaps, GapBatch):
+            angles, widths, confidences = gaps.angle, gaps.width, gaps.confidence
+        else:
+            n = len(gaps)
+            angles = np.fromiter((gap['angle'] for gap in gaps), dtype=np.float64, count=n)
+            widths = np.fromiter((gap['width'] for gap in gaps), dtype=np.float64, count=n)
+            confidences = np.fromiter((gap['confidence'] for gap in gaps),
+                                      dtype=np.float64, count=n)
+
+        if audio_data:
+            fused = self.fuse_arrays(audio_data['angle'], audio_data['snr'],
+                                     angles, widths, confidences,
+                                     self.audio_freshness(audio_age))
+        else:
+            fused = self.fuse_arrays(0.0, 0.0, angles, widths, confidences, 0.0)
+        best_index = fused['best_index']
+
+        if log.isEnabledFor(logging.DEBUG):
+            self._log_scores(audio_data, gaps, fused)
+
+        result = {
+            'best_gap': gaps[best_index],
+            'best_index': best_index,
+            'mode': fused['mode'],
+            'score': fused['score'],
+            'audio_weight': fused['weights']['audio'],
+            'audio_age': audio_age,
+            'gap_age': gap_age,
+            # 음향 - 틈 시각 차 (초, 양수면 음향이 더 최근)
+            'skew': (audio_time - gap_time
+                     if audio_time is not None and gap_time is not None else None),
+            'distance': None,
+            'distance_age': None,
+            'speed_scale': 1.0,
+            'distance_stale': False,
+            'all_scores': None
         }
+
+        if distance is not None:
+            distance_age = now - distance['time'] if distance else None
+            result['distance_age'] = distance_age
+            if distance_age is not None and distance_age <= self.max_distance_age:
+                result['distance'] = distance['distance']
+                result['speed_scale'] = self.speed_scale(distance['distance'])
+            else:
+                # 안전 입력을 잃었다고 속도 제한을 풀지 않음
+                result['distance_stale'] = True
+                result['speed_scale'] = self.stale_distance_scale
+
+        if with_scores:
+            audio_scores = fused['audio_scores']
+            gap_scores = fused['gap_scores']
+            total_scores = fused['total_scores']
+
+            # 점수 내림차순 (동점이면 원래 순서 유지)
+            order = np.argsort(-total_scores, kind='stable')
+            result['all_scores'] = [{
+                'gap': gaps[i],
+                'audio_score': float(audio_scores[i]),
+                'gap_score': float(gap_scores[i]),
+                'total_score': float(total_scores[i])
+            } for i in order]
+
+        return result
+
+    def _log_scores(self, audio_data, gaps, fused):
+        weights = fused['weights']
+
+        log.debug("\n%s\n🎯 모드: %s\n   SNR: %.1fdB\n   가중치: 음향 %.0f%% + 틈 %.0f%%\n%s",
+                  '=' * 60, fused['mode'], audio_data['snr'] if audio_data else 0.0,
+                  weights['audio'] * 100, weights['gap'] * 100, '=' * 60)
+
+        for i, gap in enumerate(gaps):
+            log.debug("\n틈 #%d (각도 %+.1f°):\n  음향: %.2f\n  틈:   %.2f\n  → 최종: %.2f",
+                      i, gap['angle'], fused['audio_scores'][i],
+                      fused['gap_scores'][i], fused['total_scores'][i])
+
+        log.debug("\n✅ 선택: 틈 #%d", fused['best_index'])
@@ -4,6 +4,12 @@
  * * [수정 사항]
  * 1. 기존 파일과의 충돌을 방지하기 위해 중복 정의된 함수 및 변수 정리
  * 2. 폴더 내 다른 .ino 파일이 있으면 컴파일 에러가 발생하므로 단일 파일로 구성함
+ * 3. 바이너리 프레임 명령 + ACK 응답, 115200bps (serial_link.py와 짝)
+ *    프레임: 0xAA | TYPE | SEQ | LEN | PAYLOAD | CRC8(TYPE..PAYLOAD)
+ *    프레임 밖의 'F','B','L','R','S' 한 바이트 명령도 그대로 처리
+ * 4. 거리 측정마다 텔레메트리 프레임(거리, 현재 명령, 플래그)을 Pi로 전송
+ * 5. 명령 워치독: 프레임으로 받은 주행 명령(F/B/L/R) 뒤 CMD_TIMEOUT_MS 동안
+ *    새 명령 프레임이 없으면 정지 (Pi 종료/USB 단절 대비, 1바이트 명령은 제외)
  */
 
 // --- 핀 설정 ---
@@ -19,12 +25,37 @@ const int echoPin = 13;
 // --- 설정값 ---
 const int DISTANCE_THRESHOLD = 15; // cm 단위
 const int MOTOR_VAL = 200;         // 변수명 충돌 방지를 위해 VAL로 명명
+const long BAUD_RATE = 115200;
+
+// --- 프레임 프로토콜 ---
+const byte FRAME_START = 0xAA;
+const byte FRAME_CMD = 0x01;       // Pi → 아두이노: 명령 문자, 속도(0 = MOTOR_VAL)
+const byte FRAME_ACK = 0x81;       // 아두이노 → Pi: 받은 SEQ, 실제 적용한 명령
+const byte FRAME_TELEMETRY = 0x82; // 아두이노 → Pi: 거리(cm, u16 LE), 현재 명령, 플래그
+const byte MAX_PAYLOAD = 32;
+
+const byte FLAG_OBSTACLE = 0x01;   // 거리 < DISTANCE_THRESHOLD
+const byte FLAG_HARD_STOP = 0x02;  // 이번 주기에 아두이노가 직접 정지시킴
+const byte FLAG_WATCHDOG = 0x04;   // 이번 주기에 명령 워치독이 정지시킴
+
+const unsigned long MEASURE_INTERVAL_MS = 30;  // 초음파 측정/전송 주기 (잔향 방지)
+const unsigned long CMD_TIMEOUT_MS = 300;      // 프레임 주행 명령 유지 시간
 
 // --- 상태 변수 ---
 char currentStatus = 'S'; 
+long lastDistance = 999;
+bool hardStop = false;             // 다음 텔레메트리에 보고할 강제 정지 여부
+unsigned long lastMeasureMs = 0;
+bool framedMotion = false;         // 프레임 명령으로 주행 중 (워치독 대상)
+bool watchdogStop = false;         // 다음 텔레메트리에 보고할 워치독 정지 여부
+unsigned long lastCmdMs = 0;       // 마지막 명령 프레임 수신 시각
+byte telemetrySeq = 0;
+
+byte frameBuf[3 + MAX_PAYLOAD];    // TYPE, SEQ, LEN, PAYLOAD
+int framePos = -1;                 // -1: 시작 바이트 대기
 
 void setup() {
-  Serial.begin(9600);
+  Serial.begin(BAUD_RATE);
   
   pinMode(trigPin, OUTPUT);
   pinMode(echoPin, INPUT);
@@ -38,30 +69,158 @@ void setup() {
 }
 
 void loop() {
-  long distance = getDistance();
+  // 1. 시리얼 명령 처리 (쌓인 바이트를 모두 처리, 지연 없음)
+  readSerial();
 
-  // 1. 능동적 안전 장치 (전진 중 장애물 발견 시 즉시 정지)
-  if (currentStatus == 'F' && distance > 0 && distance < DISTANCE_THRESHOLD) {
+  unsigned long nowMs = millis();
+
+  // 명령 워치독 (Pi가 명령을 멈추면 마지막 명령을 계속 실행하지 않음)
+  if (framedMotion && nowMs - lastCmdMs > CMD_TIMEOUT_MS) {
     stopMotors();
     currentStatus = 'S';
+    framedMotion = false;
+    watchdogStop = true;
   }
 
-  // 2. 시리얼 명령 처리
-  if (Serial.available() > 0) {
-    char command = Serial.read();
-    
-    // 전진 명령 시 거리가 가까우면 명령 무시 및 정지
-    if (command == 'F' && distance > 0 && distance < DISTANCE_THRESHOLD) {
+  if (nowMs - lastMeasureMs >= MEASURE_INTERVAL_MS) {
+    lastMeasureMs = nowMs;
+    lastDistance = getDistance();
+
+    // 2. 능동적 안전 장치 (전진 중 장애물 발견 시 즉시 정지)
+    if (currentStatus == 'F' && lastDistance > 0 && lastDistance < DISTANCE_THRESHOLD) {
       stopMotors();
       currentStatus = 'S';
-    } 
-    else {
-      executeCommand(command);
-      currentStatus = command;
+      framedMotion = false;
+      hardStop = true;
     }
+
+    // 3. 거리/상태 텔레메트리 전송
+    sendTelemetry();
   }
-  
-  delay(10); 
+
+  // 거리 측정 중에 들어온 명령도 바로 처리
+  readSerial();
+}
+
+void sendTelemetry() {
+  unsigned int distance = (lastDistance > 65535) ? 65535 : (unsigned int)lastDistance;
+  byte flags = 0;
+  if (lastDistance > 0 && lastDistance < DISTANCE_THRESHOLD) flags |= FLAG_OBSTACLE;
+  if (hardStop) flags |= FLAG_HARD_STOP;
+  if (watchdogStop) flags |= FLAG_WATCHDOG;
+
+  byte payload[4] = {
+    (byte)(distance & 0xFF), (byte)(distance >> 8), (byte)currentStatus, flags
+  };
+  sendFrame(FRAME_TELEMETRY, telemetrySeq++, payload, 4);
+  hardStop = false;
+  watchdogStop = false;
+}
+
+void readSerial() {
+  while (Serial.available() > 0) {
+    handleSerialByte((byte)Serial.read());
+  }
+}
+
+/**
+ * @brief 수신 바이트 하나 처리 (프레임 상태 기계)
+ */
+void handleSerialByte(byte b) {
+  if (framePos < 0) {
+    if (b == FRAME_START) {
+      framePos = 0;
+    } else {
+      // 예전 1바이트 명령 (워치독 제외, 명령이 아닌 잡음 바이트는 무시)
+      if (isCommand((char)b)) {
+        applyCommand((char)b, MOTOR_VAL);
+        framedMotion = false;
+      }
+    }
+    return;
+  }
+
+  if (framePos < 3) {
+    frameBuf[framePos++] = b;
+    if (framePos == 3 && frameBuf[2] > MAX_PAYLOAD) {
+      framePos = -1;                     // 길이 오류 → 재동기
+    }
+    return;
+  }
+
+  if (framePos < 3 + frameBuf[2]) {
+    frameBuf[framePos++] = b;
+    return;
+  }
+
+  // 마지막 바이트 = CRC
+  if (crc8(frameBuf, framePos) == b) {
+    handleFrame(frameBuf[0], frameBuf[1], frameBuf + 3, frameBuf[2]);
+  }
+  framePos = -1;
+}
+
+void handleFrame(byte type, byte seq, byte *payload, byte len) {
+  if (type == FRAME_CMD && len >= 2) {
+    int pwm = (payload[1] == 0) ? MOTOR_VAL : payload[1];
+    char applied = applyCommand((char)payload[0], pwm);
+    if (isCommand((char)payload[0])) {
+      lastCmdMs = millis();
+      framedMotion = (applied != 'S');
+    }
+
+    byte ack[2] = { seq, (byte)applied };
+    sendFrame(FRAME_ACK, seq, ack, 2);
+  }
+}
+
+void sendFrame(byte type, byte seq, byte *payload, byte len) {
+  byte header[3] = { type, seq, len };
+  byte crc = crc8(header, 3);
+  crc = crc8Update(crc, payload, len);
+
+  Serial.write(FRAME_START);
+  Serial.write(header, 3);
+  Serial.write(payload, len);
+  Serial.write(crc);
+}
+
+/**
+ * @brief 명령 적용 (전진 명령 시 거리가 가까우면 무시하고 정지)
+ * @return 실제로 적용된 명령
+ */
+char applyCommand(char command, int pwm) {
+  if (!isCommand(command)) {
+    return currentStatus;
+  }
+
+  if (command == 'F' && lastDistance > 0 && lastDistance < DISTANCE_THRESHOLD) {
+    command = 'S';
+    hardStop = true;
+  }
+  executeCommand(command, pwm);
+  currentStatus = command;
+  return command;
+}
+
+bool isCommand(char command) {
+  return command == 'F' || command == 'B' || command == 'L' ||
+         command == 'R' || command == 'S';
+}
+
+// CRC-8 (다항식 0x07, 초기값 0)
+byte crc8Update(byte crc, byte *data, byte len) {
+  for (byte i = 0; i < len; i++) {
+    crc ^= data[i];
+    for (byte bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x80) ? (byte)((crc << 1) ^ 0x07) : (byte)(crc << 1);
+    }
+  }
+  return crc;
+}
+
+byte crc8(byte *data, byte len) {
+  return crc8Update(0, data, len);
 }
 
 /**
@@ -85,41 +244,41 @@ long getDistance() {
 /**
  * @brief 수신된 시리얼 명령에 따라 모터 동작 실행
  */
-void executeCommand(char cmd) {
+void executeCommand(char cmd, int pwm) {
   switch (cmd) {
-    case 'F': moveForward();  break;
-    case 'B': moveBackward(); break;
-    case 'L': turnLeft();     break;
-    case 'R': turnRight();    break;
-    case 'S': stopMotors();    break;
+    case 'F': moveForward(pwm);  break;
+    case 'B': moveBackward(pwm); break;
+    case 'L': turnLeft(pwm);     break;
+    case 'R': turnRight(pwm);    break;
+    case 'S': stopMotors();      break;
   }
 }
 
-void moveForward() {
-  analogWrite(MOTOR_A_IA, MOTOR_VAL);
+void moveForward(int pwm) {
+  analogWrite(MOTOR_A_IA, pwm);
   analogWrite(MOTOR_A_IB, 0);
-  analogWrite(MOTOR_B_IA, MOTOR_VAL);
+  analogWrite(MOTOR_B_IA, pwm);
   analogWrite(MOTOR_B_IB, 0);
 }
 
-void moveBackward() {
+void moveBackward(int pwm) {
   analogWrite(MOTOR_A_IA, 0);
-  analogWrite(MOTOR_A_IB, MOTOR_VAL);
+  analogWrite(MOTOR_A_IB, pwm);
   analogWrite(MOTOR_B_IA, 0);
-  analogWrite(MOTOR_B_IB, MOTOR_VAL);
+  analogWrite(MOTOR_B_IB, pwm);
 }
 
-void turnLeft() {
-  analogWrite(MOTOR_A_IA, MOTOR_VAL);
+void turnLeft(int pwm) {
+  analogWrite(MOTOR_A_IA, pwm);
   analogWrite(MOTOR_A_IB, 0);
   analogWrite(MOTOR_B_IA, 0);
-  analogWrite(MOTOR_B_IB, MOTOR_VAL);
+  analogWrite(MOTOR_B_IB, pwm);
 }
 
-void turnRight() {
+void turnRight(int pwm) {
   analogWrite(MOTOR_A_IA, 0);
-  analogWrite(MOTOR_A_IB, MOTOR_VAL);
-  analogWrite(MOTOR_B_IA, MOTOR_VAL);
+  analogWrite(MOTOR_A_IB, pwm);
+  analogWrite(MOTOR_B_IA, pwm);
   analogWrite(MOTOR_B_IB, 0);
 }
 
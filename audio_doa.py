@@ -0,0 +1,92 @@
+# fusion/audio_doa.py
+
+import numpy as np
+
+
+class GccPhatEngine:
+    """슬라이딩 윈도우 배치 GCC-PHAT
+
+    링 버퍼에서 hop 간격으로 겹치는 프레임을 모아 한 번의 NumPy 호출로
+    지연(tau)을 추정한다. 창 함수와 작업 버퍼는 미리 만들어 재사용하고,
+    FFT 길이가 고정이라 NumPy(pocketfft)의 plan 캐시가 계속 재사용된다.
+    """
+
+    def __init__(self, fs, frame_size, hop_size, max_delay,
+                 interp=1, max_batch=16, window=True):
+        self.fs = fs
+        self.frame_size = frame_size
+        self.hop_size = hop_size
+        self.interp = interp
+        self.max_batch = max_batch
+
+        # 선형 상관이 되도록 2배 이상 길이의 2의 거듭제곱
+        self.nfft = 1 << int(np.ceil(np.log2(2 * frame_size)))
+        self.max_shift = min(int(max_delay * interp), self.nfft * interp // 2)
+
+        if window:
+            self.window = np.hanning(frame_size).astype(np.float32)
+        else:
+            self.window = np.ones(frame_size, dtype=np.float32)
+
+        # 재사용 버퍼
+        self._stage = np.empty((max_batch, frame_size, 2), dtype=np.int32)
+        self._x = np.empty((max_batch, frame_size), dtype=np.float32)
+        self._y = np.empty((max_batch, frame_size), dtype=np.float32)
+
+        self.next_end = frame_size   # 다음 프레임의 끝 샘플 위치
+        self.skipped = 0             # 밀려서 건너뛴 hop 수
+
+    def reset(self, pos):
+        """pos 이후부터 hop 처리 시작"""
+        self.next_end = max(pos + self.hop_size, self.frame_size)
+
+    def pull(self, ring):
+        """링 버퍼에 쌓인 hop 프레임들을 모아서 반환 (frames, ends)
+
+        frames는 (k, frame_size, 2) 재사용 버퍼의 뷰이므로 다음 pull 전까지만 유효
+        """
+        write_pos = ring.write_pos
+        if write_pos < self.next_end:
+            return self._stage[:0], np.empty(0, dtype=np.int64)
+
+        n_avail = (write_pos - self.next_end) // self.hop_size + 1
+        k = min(n_avail, self.max_batch)
+        self.skipped += n_avail - k
+
+        last = self.next_end + (n_avail - 1) * self.hop_size
+        self.next_end = last + self.hop_size
+        ends = last - self.hop_size * np.arange(k - 1, -1, -1, dtype=np.int64)
+
+        # 덮어써진 프레임은 제외
+        valid = 0
+        for end in ends:
+            if ring.read(int(end), self.frame_size, out=self._stage[valid]) is not None:
+                ends[valid] = end
+                valid += 1
+
+        return self._stage[:valid], ends[:valid]
+
+    def estimate_delays(self, frames):
+        """(k, frame_size, 2) 프레임 묶음 → 채널 간 지연 tau(초) 배열"""
+        k = len(frames)
+        if k == 0:
+            return np.empty(0)
+
+        x = self._x[:k]
+        y = self._y[:k]
+        np.multiply(frames[:, :, 0], self.window, out=x, casting='same_kind')
+        np.multiply(frames[:, :, 1], self.window, out=y, casting='same_kind')
+
+        X = np.fft.rfft(x, n=self.nfft, axis=1)
+        Y = np.fft.rfft(y, n=self.nfft, axis=1)
+
+        # PHAT 가중 교차 스펙트럼
+        R = X * np.conj(Y)
+        R /= np.abs(R) + 1e-12
+
+        cc = np.fft.irfft(R, n=self.interp * self.nfft, axis=1)
+        m = self.max_shift
+        cc = np.concatenate((cc[:, -m:], cc[:, :m + 1]), axis=1) if m else cc[:, :1]
+
+        shift = np.argmax(np.abs(cc), axis=1) - m
+        return shift / float(self.interp * self.fs)
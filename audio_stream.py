@@ -0,0 +1,84 @@
+# fusion/audio_stream.py
+
+import threading
+import time
+import numpy as np
+
+
+class AudioRingBuffer:
+    """단일 생산자 오디오 링 버퍼 (락 없음)
+
+    sounddevice 콜백 스레드만 write()를 호출한다. write_pos(누적 샘플 수)는
+    데이터를 다 쓴 뒤에 갱신되므로 읽는 쪽은 락 없이 최신 구간을 복사할 수 있다.
+    """
+
+    def __init__(self, capacity, channels=2, dtype=np.int32):
+        self.capacity = capacity
+        self.channels = channels
+        self.buffer = np.zeros((capacity, channels), dtype=dtype)
+
+        self.write_pos = 0           # 지금까지 기록된 총 샘플 수
+        self.last_write_time = 0.0   # 마지막 기록 시각 (monotonic)
+        self.overflows = 0           # 장치 입력 오버플로 횟수
+        self._stamp = (0, 0.0)       # (write_pos, 기록 시각) 한 쌍, 통째로 교체
+
+        self._new_data = threading.Event()
+
+    def write(self, block):
+        """콜백 블록 기록 (콜백 스레드 전용)"""
+        n = len(block)
+        data = block[-self.capacity:] if n > self.capacity else block
+        m = len(data)
+
+        start = (self.write_pos + n - m) % self.capacity
+        first = min(m, self.capacity - start)
+        self.buffer[start:start + first] = data[:first]
+        if first < m:
+            self.buffer[:m - first] = data[first:]
+
+        self.last_write_time = time.monotonic()
+        self.write_pos += n
+        self._stamp = (self.write_pos, self.last_write_time)
+        self._new_data.set()
+
+    def read(self, end, n, out=None):
+        """[end - n, end) 구간을 out에 복사 (이미 덮어써졌으면 None)"""
+        if n > self.capacity or end > self.write_pos:
+            return None
+        if end - n < self.write_pos - self.capacity:
+            return None
+
+        if out is None:
+            out = np.empty((n, self.channels), dtype=self.buffer.dtype)
+
+        start = (end - n) % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        if first < n:
+            out[first:] = self.buffer[:n - first]
+
+        # 복사 도중 생산자가 구간을 덮어썼는지 확인
+        if end - n < self.write_pos - self.capacity:
+            return None
+        return out
+
+    def time_at(self, pos, fs):
+        """누적 샘플 위치 pos의 추정 캡처 시각 (monotonic, 마지막 기록 기준 역산)"""
+        write_pos, write_time = self._stamp
+        return write_time - (write_pos - pos) / fs
+
+    def latest(self, n, out=None):
+        """가장 최근 n 샘플"""
+        return self.read(self.write_pos, n, out)
+
+    def wait_for(self, pos, timeout=1.0):
+        """write_pos가 pos 이상이 될 때까지 대기 (단일 소비자 기준)"""
+        deadline = time.monotonic() + timeout
+        while self.write_pos < pos:
+            self._new_data.clear()
+            if self.write_pos >= pos:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._new_data.wait(remaining):
+                return self.write_pos >= pos
+        return True
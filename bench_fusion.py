@@ -0,0 +1,421 @@
+"""
+인지/융합 핫패스 벤치마크
+
+합성 데이터(지정 방위·SNR의 스테레오 신호, 틈 위치를 아는 프레임)와
+기록 세션(--session)으로 단계별 지연 백분위수, 처리량, 호출당 임시 할당량을 측정한다.
+
+  python bench_fusion.py                      # 측정만
+  python bench_fusion.py --save-baseline      # 기준값 저장
+  python bench_fusion.py --check              # 기준 대비 느려지면 실패 (exit 1)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+import json
+import itertools
+import argparse
+import tracemalloc
+import cv2
+import numpy as np
+
+from fusion.sensor_wrapper import CameraSensorWrapper
+import direction_finder as df  # sensor_wrapper가 경로 추가
+from fusion.adaptive_fusion import AdaptiveFusion
+from fusion.audio_doa import GccPhatEngine
+from fusion.noise_floor import NoiseFloor, frame_rms
+from fusion.gap import GapBatch
+from fusion.gap_tracker import GapTracker
+from fusion.pipeline import FusionStage
+from fusion.drive_controller import DriveController
+from fusion.sensor_record import SessionReader
+from fusion.visualize import visualize_fast
+
+RESOLUTIONS = [(320, 240), (640, 480), (1280, 720)]
+BEARINGS = [-60, -20, 0, 30]
+SNRS_DB = [0, 10, 20]
+GAP_SPANS = [(0.05, 0.25), (0.4, 0.6), (0.7, 0.95)]  # 폭 대비 (시작, 끝)
+# 활성 게이트 장면: (이름, 배경 RMS 변화 [(시작 시각, RMS)], 소리 시작 시각 또는 None, 길이)
+#   소리가 있으면 소리 구간 프레임의 통과 비율(pass_rate)을,
+#   없으면 마지막 GATE_TAIL초 동안 배경 프레임의 건너뜀 비율(skip_rate)을 본다
+GATE_SCENES = [
+    ('startup', [(0.0, 5e5)], 0.0, 15.0),
+    ('after_quiet', [(0.0, 5e5)], 5.0, 15.0),
+    ('quiet_to_loud', [(0.0, 1e5), (17.0, 1e6)], None, 60.0),
+    ('loud_start', [(0.0, 3e6)], None, 40.0),
+]
+GATE_TAIL = 10.0
+# 주행 failsafe: 탐지가 멈춘 채 카메라 프레임만 계속 올 때 (초)
+DRIVE_FROZEN_SECONDS = 1.0
+GATE_MIN_RATE = 0.95   # 소리는 이 비율 이상 통과, 배경은 이 비율 이상 건너뛰어야 함
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'bench_baseline.json')
+
+
+# === 합성 데이터 ===
+
+def make_gap_frame(width, height, gap_spans, seed=0):
+    """밝은 배경 + 하단 ROI에 어두운 틈 (gap_spans: 폭 대비 비율 (시작, 끝))"""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(150, 255, size=(height, width, 3), dtype=np.uint8)
+    roi_top = int(height * 0.6)
+    for start, end in gap_spans:
+        frame[roi_top:, int(start * width):int(end * width)] = rng.integers(
+            0, 30, size=(height - roi_top, int(end * width) - int(start * width), 3),
+            dtype=np.uint8)
+    return frame
+
+
+def make_stereo(bearing_deg, snr_db, n_samples, fs=None, seed=0):
+    """지정 방위에서 온 대역 잡음 신호 + 채널별 백색 잡음 (int32 2채널)"""
+    fs = fs or df.FS
+    rng = np.random.default_rng(seed)
+
+    delay = df.MIC_DISTANCE * np.sin(np.radians(bearing_deg)) / df.C_SPEED * fs
+    shift = int(round(delay))
+
+    # 오른쪽 채널이 shift 샘플 앞서도록 잘라냄
+    pad = abs(shift) + 1
+    source = np.convolve(rng.standard_normal(n_samples + 2 * pad), np.ones(4) / 4, 'same')
+    left = source[pad:pad + n_samples]
+    right = source[pad + shift:pad + shift + n_samples]
+
+    noise_gain = np.std(left) / (10 ** (snr_db / 20))
+    stereo = np.stack([left + rng.standard_normal(n_samples) * noise_gain,
+                       right + rng.standard_normal(n_samples) * noise_gain], axis=1)
+    stereo *= 1e8 / np.max(np.abs(stereo))
+    return stereo.astype(np.int32), shift
+
+
+def make_camera(detector='contour', scale=1.0):
+    """캡처 없이 탐지기만 쓰는 CameraSensorWrapper"""
+    class _NoCapture:
+        def isOpened(self):
+            return True
+
+    return CameraSensorWrapper(capture=_NoCapture(), detector=detector,
+                               projection_scale=scale)
+
+
+# === 측정 ===
+
+def measure(fn, repeat=200, warmup=10, alloc_repeat=20):
+    """지연 백분위수(ms), 처리량(회/초), 호출당 임시 할당량(바이트)
+
+    임시 할당량: 호출 하나가 진행되는 동안 추적 메모리가 호출 직전보다
+    가장 많이 늘어난 양 (호출 안에서 만들고 버린 배열까지 포함)
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = np.empty(repeat)
+    start = time.perf_counter()
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - t0
+    elapsed = time.perf_counter() - start
+
+    # tracemalloc은 느리므로 별도 짧은 실행 (OpenCV 내부 할당은 잡히지 않음)
+    transient = np.empty(alloc_repeat)
+    tracemalloc.start()
+    for i in range(alloc_repeat):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        transient[i] = peak - before
+    tracemalloc.stop()
+
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99]) * 1000
+    return {
+        'p50_ms': float(p50),
+        'p90_ms': float(p90),
+        'p99_ms': float(p99),
+        'throughput': repeat / elapsed,
+        'transient_bytes_per_call': float(np.median(transient)),
+        'transient_bytes_max': float(transient.max())
+    }
+
+
+def bench_detection(results, repeat):
+    spans = GAP_SPANS
+    for width, height in RESOLUTIONS:
+        frame = make_gap_frame(width, height, spans)
+        for detector, scale in [('contour', 1.0), ('projection', 1.0), ('projection', 0.5)]:
+            camera = make_camera(detector, scale)
+            gaps, _ = camera.detect_gaps(frame)
+            name = f"detect/{detector}@{scale:g}/{width}x{height}"
+            results[name] = measure(lambda: camera.detect_gaps(frame), repeat)
+            results[name]['gaps_found'] = f"{len(gaps)}/{len(spans)}"
+
+
+def bench_audio(results, repeat):
+    n = df.SAMPLES_PER_FRAME
+    engine = GccPhatEngine(df.FS, n, n // 2, df.MAX_DELAY_SAMPLES)
+
+    for snr_db in SNRS_DB:
+        blocks = [make_stereo(b, snr_db, n, seed=i) for i, b in enumerate(BEARINGS)]
+
+        # 정확도: 배치 엔진이 찾은 지연(샘플) 오차
+        frames = np.stack([block for block, _ in blocks])
+        taus = engine.estimate_delays(frames) * df.FS
+        errors = [abs(t - shift) for t, (_, shift) in zip(taus, blocks)]
+
+        block = blocks[0][0]
+        name = f"gcc_phat/single/snr{snr_db}"
+        results[name] = measure(lambda: df.gcc_phat(block[:, 0], block[:, 1],
+                                                    df.FS, df.MAX_DELAY_SAMPLES), repeat)
+
+        batch = np.stack([blocks[i % len(blocks)][0] for i in range(engine.max_batch)])
+        name = f"gcc_phat/batch{engine.max_batch}/snr{snr_db}"
+        results[name] = measure(lambda: engine.estimate_delays(batch), repeat)
+        results[name]['per_estimate_ms'] = results[name]['p50_ms'] / engine.max_batch
+        results[name]['max_delay_error'] = float(max(errors))
+
+
+def bench_gate(results, repeat):
+    """소음 바닥 게이트: 계속 나는 소리는 통과하고, 장소가 바뀌어도 배경은 걸러지는지 확인
+
+    배경 잡음 위에 (장면에 따라) 소리를 얹은 hop 묶음을 순서대로 넣는다.
+    """
+    n = df.SAMPLES_PER_FRAME
+    hop = n // 2
+    k = 4
+    seconds = k * hop / df.FS
+    rng = np.random.default_rng(0)
+    source, _ = make_stereo(BEARINGS[0], 20, n * k)
+    source = source.reshape(k, n, 2).astype(np.float64)
+    source *= 5e6 / np.sqrt(np.mean(source ** 2))
+
+    for scene, levels, onset, duration in GATE_SCENES:
+        noise_floor = NoiseFloor()
+        passed = total = 0
+        for step in range(int(duration / seconds)):
+            t = step * seconds
+            level = [rms for start, rms in levels if start <= t][-1]
+            frames = rng.normal(0.0, level, size=(k, n, 2))
+            has_source = onset is not None and t >= onset
+            if has_source:
+                frames += source
+            _, active = noise_floor.update(frame_rms(frames), seconds)
+            if has_source:
+                passed += int(active.sum())
+                total += k
+            elif onset is None and t >= duration - GATE_TAIL:
+                passed += int(k - active.sum())
+                total += k
+
+        rms = frame_rms(frames)
+        name = f"gate/{scene}"
+        results[name] = measure(lambda: noise_floor.update(rms, seconds), repeat)
+        results[name]['pass_rate' if onset is not None else 'skip_rate'] = passed / total
+
+
+def bench_fusion(results, repeat):
+    fusion = AdaptiveFusion()
+    audio = {'angle': 10.0, 'snr': 20.0}
+
+    for n_gaps in (1, 4, 16):
+        batch = GapBatch.from_spans(np.linspace(0, 560, n_gaps), np.full(n_gaps, 80), 640)
+        results[f"fuse/batch/{n_gaps}"] = measure(
+            lambda: fusion.fuse(audio, batch, with_scores=False), repeat)
+
+        dicts = [gap.to_dict() for gap in batch]
+        results[f"fuse/dicts/{n_gaps}"] = measure(
+            lambda: fusion.fuse(audio, dicts, with_scores=False), repeat)
+
+
+class _RecordingLink:
+    """DriveController용 가짜 링크 (보낸 명령만 기록)"""
+
+    def __init__(self):
+        self.commands = []
+
+    def send(self, command, speed=0):
+        self.commands.append(command)
+
+
+def bench_drive(results, repeat):
+    """탐지기가 멈추고 카메라는 계속 돌 때 제어기가 failsafe로 정지하는지 확인
+
+    첫 프레임만 탐지하고 이후 프레임은 추적기 예측만 융합에 넣는다
+    (음향은 매 프레임 새로 들어옴). 실제 시간으로 DRIVE_FROZEN_SECONDS 동안 돈다.
+    """
+    stage = FusionStage(AdaptiveFusion())
+    tracker = GapTracker()
+    link = _RecordingLink()
+    controller = DriveController(stage.result, link)
+
+    start = time.monotonic()
+    detected = GapBatch.from_spans([280.0], [80.0], 640, start)
+    stage.put_gaps(tracker.update(detected, 640, start), timestamp=start)
+    while time.monotonic() - start < DRIVE_FROZEN_SECONDS:
+        now = time.monotonic()
+        stage.put_audio({'angle': 0.0, 'snr': 20.0, 'time': now})
+        stage.put_gaps(tracker.predict(now), timestamp=now)
+        controller.tick(now)
+        time.sleep(controller.period)
+
+    failsafe_stops, last_command = controller.failsafe_stops, link.commands[-1]
+    name = "drive/frozen_detector"
+    results[name] = measure(controller.tick, repeat)
+    results[name]['failsafe_stops'] = failsafe_stops
+    results[name]['last_command'] = last_command
+
+
+def bench_render(results, repeat):
+    spans = GAP_SPANS
+    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 70]
+
+    for width, height in RESOLUTIONS:
+        frame = make_gap_frame(width, height, spans)
+        gaps, debug_info = make_camera().detect_gaps(frame)
+        result = {'best_index': 0, 'best_gap': gaps[0], 'mode': 'audio_trust'}
+        audio = {'angle': 10.0, 'snr': 20.0}
+
+        results[f"render/{width}x{height}"] = measure(
+            lambda: visualize_fast(frame, gaps, result, audio, debug_info), repeat)
+
+        vis = visualize_fast(frame, gaps, result, audio, debug_info)
+        results[f"jpeg/{width}x{height}"] = measure(
+            lambda: cv2.imencode('.jpg', vis, encode_param), repeat)
+
+
+def bench_session(results, path, repeat):
+    """기록 세션의 실제 프레임/오디오로 측정"""
+    reader = SessionReader(path)
+
+    frames = [frame for _, frame in reader.records('camera')][:repeat]
+    if frames:
+        camera = make_camera()
+        frame_cycle = itertools.cycle(frames)
+        results['session/detect'] = measure(
+            lambda: camera.detect_gaps(next(frame_cycle)), repeat)
+
+    blocks = [block for _, block in reader.records('audio')]
+    if blocks:
+        audio = np.concatenate(blocks)
+        n = df.SAMPLES_PER_FRAME
+        count = len(audio) // n
+        if count:
+            engine = GccPhatEngine(df.FS, n, n // 2, df.MAX_DELAY_SAMPLES)
+            k = min(count, engine.max_batch)
+            batch = audio[:k * n].reshape(k, n, 2)
+            results['session/gcc_phat'] = measure(lambda: engine.estimate_delays(batch), repeat)
+
+
+# === 기준값 비교 ===
+
+def check_baseline(results, baseline, tolerance):
+    """p50이 기준보다 tolerance 이상 느려진 단계 목록"""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        limit = base['p50_ms'] * (1 + tolerance)
+        if stats['p50_ms'] > limit:
+            regressions.append((name, base['p50_ms'], stats['p50_ms']))
+    return regressions
+
+
+def check_gate(results):
+    """소리 통과 비율이나 배경 건너뜀 비율이 GATE_MIN_RATE 미만인 장면 목록"""
+    failures = []
+    for name, stats in results.items():
+        for key, label in (('pass_rate', '소리 통과'), ('skip_rate', '배경 건너뜀')):
+            if stats.get(key, 1.0) < GATE_MIN_RATE:
+                failures.append((name, label, stats[key]))
+    return failures
+
+
+def check_drive(results):
+    """탐지가 멈췄는데도 정지하지 않은 주행 장면 목록"""
+    return [name for name, stats in results.items()
+            if 'failsafe_stops' in stats
+            and (stats['failsafe_stops'] == 0 or stats['last_command'] != 'S')]
+
+
+def print_results(results):
+    print(f"\n{'단계':<40} {'p50':>8} {'p90':>8} {'p99':>8} {'회/초':>9} {'임시할당/회':>10}")
+    print("-" * 88)
+    for name, s in results.items():
+        extra = ''
+        if 'gaps_found' in s:
+            extra = f"  틈 {s['gaps_found']}"
+        if 'max_delay_error' in s:
+            extra = f"  오차 {s['max_delay_error']:.0f}샘플, 추정당 {s['per_estimate_ms']:.3f}ms"
+        if 'pass_rate' in s:
+            extra = f"  통과 {s['pass_rate']:.0%}"
+        if 'skip_rate' in s:
+            extra = f"  배경 건너뜀 {s['skip_rate']:.0%}"
+        if 'failsafe_stops' in s:
+            extra = f"  failsafe {s['failsafe_stops']}회, 마지막 {s['last_command']}"
+        print(f"{name:<40} {s['p50_ms']:>8.3f} {s['p90_ms']:>8.3f} {s['p99_ms']:>8.3f} "
+              f"{s['throughput']:>9.0f} {s['transient_bytes_per_call']:>9.0f}B{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="인지/융합 핫패스 벤치마크")
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--session', metavar='DIR', help="기록 세션도 측정")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true',
+                        help="기준 대비 회귀가 있으면 exit 1")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="허용 p50 증가율 (기본 25%%)")
+    args = parser.parse_args()
+
+    results = {}
+    bench_detection(results, args.repeat)
+    bench_audio(results, args.repeat)
+    bench_gate(results, args.repeat)
+    bench_fusion(results, args.repeat)
+    bench_drive(results, args.repeat)
+    bench_render(results, args.repeat)
+    if args.session:
+        bench_session(results, args.session, args.repeat)
+
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 기준값 저장: {args.baseline}")
+
+    if args.check:
+        gated = check_gate(results)
+        if gated:
+            print(f"\n❌ 소음 바닥 게이트 실패 (최소 {GATE_MIN_RATE:.0%}):")
+            for name, label, rate in gated:
+                print(f"   {name}: {label} {rate:.0%}")
+            sys.exit(1)
+
+        unstopped = check_drive(results)
+        if unstopped:
+            print("\n❌ 탐지가 멈췄는데 주행 제어기가 정지하지 않음:")
+            for name in unstopped:
+                print(f"   {name}")
+            sys.exit(1)
+
+        if not os.path.exists(args.baseline):
+            print(f"\n❌ 기준값 파일 없음: {args.baseline}")
+            print("   먼저 --save-baseline으로 기준값을 저장하세요")
+            sys.exit(2)
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = check_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ 성능 회귀 {len(regressions)}건 (허용 +{args.tolerance:.0%}):")
+            for name, base, now in regressions:
+                print(f"   {name}: {base:.3f}ms → {now:.3f}ms ({now / base - 1:+.0%})")
+            sys.exit(1)
+        print("\n✅ 기준 대비 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
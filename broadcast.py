@@ -0,0 +1,141 @@
+# fusion/broadcast.py
+
+import threading
+import time
+import cv2
+import numpy as np
+
+
+class FrameBroadcaster:
+    """인코딩 1회 MJPEG 방송 허브
+
+    publish()는 프레임을 허브 소유 버퍼에 복사하므로 호출한 쪽은 바로 자기
+    버퍼를 다시 써도 된다. 새 프레임을 처음 가져가는 구독자가 JPEG 인코딩을
+    한 번 하고, 나머지 구독자는 같은 bytes를 공유한다.
+    느린 구독자는 밀린 프레임을 쌓지 않고 최신 프레임으로 건너뛴다.
+
+    구독자가 인코딩하려고 가져간 버퍼는 고정(pin)해 두고, publish()는 고정되지
+    않은 버퍼에만 쓴다 (비어 있는 버퍼가 없으면 하나 더 할당).
+    구독자가 없으면 publish()는 복사하지 않고 버린다.
+
+    복사 없이 게시하려면 claim()으로 빈 버퍼를 고정해 받아 직접 채운 뒤
+    commit() (실패하면 release())한다.
+    """
+
+    def __init__(self, quality=70, encode_hist=None, age_hist=None):
+        self.encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+
+        self._cond = threading.Condition()
+        self._buffers = []     # 허브 소유 프레임 버퍼
+        self._pins = []        # 버퍼별 고정 수 (인코딩 중인 구독자 + claim)
+        self._current = -1     # 최신 프레임이 든 버퍼 번호
+        self._frame_time = 0.0
+        self._seq = 0
+
+        self._encode_lock = threading.Lock()
+        self._chunk = None
+        self._chunk_time = 0.0
+        self._chunk_seq = 0
+
+        self.encodes = 0
+        self.subscribers = 0
+
+        # 선택: 인코딩 지연, 전송 시점 프레임 나이(캡처 기준) 히스토그램
+        self.encode_hist = encode_hist
+        self.age_hist = age_hist
+
+    def publish(self, frame, timestamp=None):
+        """새 시각화 프레임을 복사해 등록 후 구독자 깨우기 (timestamp: 캡처 시각, monotonic)"""
+        with self._cond:
+            if self.subscribers == 0:
+                return
+            index = self._free_buffer(frame.shape, frame.dtype)
+            np.copyto(self._buffers[index], frame)
+            self._set_current(index, timestamp)
+
+    def claim(self, shape, dtype=np.uint8):
+        """직접 채울 빈 버퍼를 고정해서 (번호, 버퍼)로 반환 (구독자가 없으면 None)"""
+        with self._cond:
+            if self.subscribers == 0:
+                return None
+            index = self._free_buffer(tuple(shape), np.dtype(dtype))
+            self._pins[index] += 1
+            return index, self._buffers[index]
+
+    def commit(self, index, timestamp=None):
+        """claim()으로 받아 채운 버퍼를 최신 프레임으로 게시"""
+        with self._cond:
+            self._pins[index] -= 1
+            self._set_current(index, timestamp)
+
+    def release(self, index):
+        """claim()한 버퍼를 게시하지 않고 돌려놓기"""
+        with self._cond:
+            self._pins[index] -= 1
+
+    def _set_current(self, index, timestamp):
+        """index 버퍼를 최신 프레임으로 (_cond 안에서 호출)"""
+        self._current = index
+        self._frame_time = timestamp if timestamp is not None else time.monotonic()
+        self._seq += 1
+        self._cond.notify_all()
+
+    def _free_buffer(self, shape, dtype):
+        """최신 프레임도 아니고 고정되지도 않은 버퍼 번호 (_cond 안에서 호출)"""
+        for i, buffer in enumerate(self._buffers):
+            if i == self._current or self._pins[i]:
+                continue
+            if buffer.shape != shape or buffer.dtype != dtype:
+                self._buffers[i] = np.empty(shape, dtype=dtype)
+            return i
+        self._buffers.append(np.empty(shape, dtype=dtype))
+        self._pins.append(0)
+        return len(self._buffers) - 1
+
+    def _encode(self, seq, frame, frame_time):
+        """seq 프레임의 multipart 조각 (이미 인코딩됐으면 재사용)"""
+        with self._encode_lock:
+            if self._chunk_seq < seq:
+                t0 = time.perf_counter()
+                ret, buffer = cv2.imencode('.jpg', frame, self.encode_param)
+                if not ret:
+                    return None
+                self._chunk = (b'--frame\r\n'
+                               b'Content-Type: image/jpeg\r\n\r\n' +
+                               buffer.tobytes() + b'\r\n')
+                self._chunk_time = frame_time
+                self._chunk_seq = seq
+                self.encodes += 1
+                if self.encode_hist is not None:
+                    self.encode_hist.observe_since(t0)
+            return self._chunk
+
+    def frames(self, timeout=1.0):
+        """구독 제너레이터 (Flask Response용 multipart 조각)"""
+        with self._cond:
+            self.subscribers += 1
+            # 구독자가 없는 동안 게시를 건너뛰었으므로 남아 있는 프레임은 오래됨
+            last_seq = self._seq
+
+        try:
+            while True:
+                with self._cond:
+                    if not self._cond.wait_for(lambda: self._seq > last_seq, timeout):
+                        continue
+                    seq, index, frame_time = self._seq, self._current, self._frame_time
+                    frame = self._buffers[index]
+                    self._pins[index] += 1
+
+                try:
+                    chunk = self._encode(seq, frame, frame_time)
+                finally:
+                    with self._cond:
+                        self._pins[index] -= 1
+                last_seq = max(seq, self._chunk_seq)
+                if chunk is not None:
+                    if self.age_hist is not None:
+                        self.age_hist.observe((time.monotonic() - self._chunk_time) * 1000.0)
+                    yield chunk
+        finally:
+            with self._cond:
+                self.subscribers -= 1
@@ -0,0 +1,108 @@
+# fusion/detect_scheduler.py
+
+import math
+import cv2
+import numpy as np
+
+
+class DetectionScheduler:
+    """부하 적응형 틈 탐지 주기 결정 (고정 yolo_interval 대체)
+
+    - 부하: 목표 프레임 시간 안에 탐지 비용이 나눠 들어가도록 간격을 정함
+      (탐지 없는 프레임 비용 + 탐지 비용 / 간격 <= 목표 프레임 시간)
+    - 장면 변화: 마지막 탐지 프레임과의 축소 영상 차이가 크면 즉시 탐지
+    - 요청: 최선 틈을 놓쳤을 때 등 request()로 다음 프레임에 탐지
+    - 정지 장면: 탐지 때마다 변화가 작으면 간격을 두 배씩 늘림 (max_interval까지)
+    """
+
+    def __init__(self, target_fps=15.0, min_interval=1, max_interval=12,
+                 change_threshold=12.0, static_threshold=3.0, smoothing=0.2,
+                 thumb_size=(32, 24)):
+        self.target_ms = 1000.0 / target_fps
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.change_threshold = change_threshold   # 평균 밝기 차이 (0~255)
+        self.static_threshold = static_threshold
+        self.smoothing = smoothing                 # 비용 지수이동평균 계수
+        self.thumb_size = thumb_size
+
+        self.detect_ms = 0.0   # 탐지 1회 비용 (평균)
+        self.frame_ms = 0.0    # 탐지 없는 프레임 1회 비용 (평균)
+        self.last_diff = 0.0
+        self.reason = None
+        self.triggers = {'schedule': 0, 'change': 0, 'request': 0}
+
+        self._static_level = 0
+        self._since = 0
+        self._pending = True   # 첫 프레임은 바로 탐지
+        self._thumb = np.empty(thumb_size[::-1] + (3,), dtype=np.uint8)
+        self._ref = None       # 마지막 탐지 프레임의 축소 영상 (int16)
+
+    @property
+    def load_interval(self):
+        """측정한 비용으로 목표 프레임 시간을 지킬 수 있는 최소 간격"""
+        budget = self.target_ms - self.frame_ms
+        if self.detect_ms <= 0.0:
+            return self.min_interval
+        if budget <= 0.0:
+            return self.max_interval
+        return min(max(math.ceil(self.detect_ms / budget), self.min_interval),
+                   self.max_interval)
+
+    @property
+    def interval(self):
+        return min(self.load_interval << self._static_level, self.max_interval)
+
+    def request(self):
+        """다음 프레임에 탐지 (최선 틈 분실 등)"""
+        self._pending = True
+
+    def should_detect(self, frame):
+        """이번 프레임에서 탐지할지 결정 (매 프레임 1회 호출)"""
+        self._since += 1
+        self.last_diff = self._frame_diff(frame)
+
+        if self._pending:
+            reason = 'request'
+        elif self.last_diff >= self.change_threshold:
+            reason = 'change'
+        elif self._since >= self.interval:
+            reason = 'schedule'
+        else:
+            return False
+
+        self.reason = reason
+        self.triggers[reason] += 1
+        return True
+
+    def record_detection(self, detect_ms):
+        """탐지 실행 후 호출: 비용 갱신, 기준 영상 교체, 정지 장면 판단"""
+        self.detect_ms = self._average(self.detect_ms, detect_ms)
+
+        if self._ref is not None and self.last_diff < self.static_threshold:
+            if self.interval < self.max_interval:
+                self._static_level += 1
+        else:
+            self._static_level = 0
+
+        if self._ref is None:
+            self._ref = np.empty(self._thumb.shape, dtype=np.int16)
+        np.copyto(self._ref, self._thumb)
+        self._since = 0
+        self._pending = False
+
+    def record_frame(self, frame_ms):
+        """탐지하지 않은 프레임의 처리 비용"""
+        self.frame_ms = self._average(self.frame_ms, frame_ms)
+
+    def _average(self, current, value):
+        if current <= 0.0:
+            return value
+        return current + self.smoothing * (value - current)
+
+    def _frame_diff(self, frame):
+        """마지막 탐지 프레임 대비 축소 영상 평균 절대 차이"""
+        cv2.resize(frame, self.thumb_size, dst=self._thumb, interpolation=cv2.INTER_AREA)
+        if self._ref is None:
+            return 0.0
+        return float(np.mean(np.abs(self._ref - self._thumb)))
@@ -0,0 +1,157 @@
+# fusion/drive_controller.py
+
+import time
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class DriveController:
+    """융합 결과 → 모터 명령 고정 주기 제어 루프
+
+    매 주기 FusionStage 결과 채널의 최신 스냅샷을 읽어 최선 틈 각도로
+    F/L/R/S 명령과 PWM을 정하고 link.send()로 보낸다 (같은 명령도 매 주기 전송).
+    융합에 쓴 틈의 실제 측정 시각이 max_result_age보다 오래됐거나 융합 결과가
+    없으면 정지(failsafe). 결과는 음향 hop마다, 틈은 추적기 예측으로 매 프레임
+    다시 게시되므로 게시 시각이 아니라 측정 시각으로 판단한다
+    (카메라나 탐지가 멈추면 정지).
+    결과의 speed_scale(초음파 거리 기반, 측정이 끊기면 융합기의 보수적 배율)만큼
+    직진 PWM을 줄이고, 0이면 정지한다.
+
+    절대 마감 시각 기준으로 돌며, 늦게 깨어난 정도(지터)와 놓친 주기,
+    융합 → 명령 전송 지연, 캡처 → 명령 전송 지연을 기록한다.
+    """
+
+    def __init__(self, results, link, rate_hz=20.0, max_result_age=0.3,
+                 deadband_deg=8.0, drive_pwm=180, min_drive_pwm=110,
+                 min_turn_pwm=130, max_turn_pwm=220,
+                 full_turn_deg=30.0, jitter_hist=None, latency_hist=None,
+                 sensor_hist=None):
+        self.results = results          # LatestValue (FusionStage.result)
+        self.link = link                # send(command, speed)를 가진 링크
+        self.period = 1.0 / rate_hz
+        self.max_result_age = max_result_age
+
+        self.deadband_deg = deadband_deg   # 이 각도 안이면 직진
+        self.drive_pwm = drive_pwm
+        self.min_drive_pwm = min_drive_pwm  # 감속 시 하한 (이보다 낮으면 모터가 멈춤)
+        self.min_turn_pwm = min_turn_pwm
+        self.max_turn_pwm = max_turn_pwm
+        self.full_turn_deg = full_turn_deg  # 이 각도 이상이면 최대 회전 PWM
+
+        # 선택: 기상 지연(지터), 융합→전송, 캡처→전송 히스토그램 (ms)
+        self.jitter_hist = jitter_hist
+        self.latency_hist = latency_hist
+        self.sensor_hist = sensor_hist
+
+        self.ticks = 0
+        self.missed_deadlines = 0   # 한 주기 이상 늦어 건너뛴 주기 수
+        self.failsafe_stops = 0     # 데이터가 없거나 오래돼서 보낸 정지 명령 수
+        self.obstacle_stops = 0     # 전방 거리 때문에 보낸 정지 명령 수
+        self.max_jitter_ms = 0.0
+        self.command = 'S'
+        self.speed = 0
+
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """제어 루프를 멈추고 정지 명령 전송"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.link.send('S')
+        self.command, self.speed = 'S', 0
+
+    def _run(self):
+        deadline = time.monotonic()
+        while self._running:
+            deadline += self.period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            now = time.monotonic()
+            lateness = now - deadline
+            if lateness >= self.period:
+                # 한 주기 이상 밀림 → 놓친 주기는 건너뛰고 마감 시각을 다시 맞춤
+                missed = int(lateness // self.period)
+                self.missed_deadlines += missed
+                deadline += missed * self.period
+            jitter_ms = max(lateness, 0.0) * 1000.0
+            self.max_jitter_ms = max(self.max_jitter_ms, jitter_ms)
+            if self.jitter_hist is not None:
+                self.jitter_hist.observe(jitter_ms)
+
+            try:
+                self.tick(now)
+            except Exception:
+                log.exception("주행 제어 오류")
+                self.link.send('S')
+
+    def tick(self, now=None):
+        """제어 1회: 최신 융합 결과 → 명령 전송"""
+        if now is None:
+            now = time.monotonic()
+        self.ticks += 1
+
+        snapshot, _, result_time = self.results.get()
+        result = snapshot.get('result') if snapshot else None
+        # 틈의 실제 측정 시각 (추적기 예측이면 마지막 탐지 시각)
+        # 측정 시각이 없으면(dict 목록) 게시 시각으로 대신함
+        gaps = snapshot.get('gaps') if snapshot else None
+        gap_time = getattr(gaps, 'timestamp', None)
+        measured_time = getattr(gaps, 'measurement_time', None)
+        sensor_time = measured_time if measured_time is not None else result_time
+
+        if result is None or now - sensor_time > self.max_result_age:
+            if self.command != 'S':
+                log.info("⛔ failsafe 정지 (융합 결과 없음/오래됨)")
+            self.failsafe_stops += 1
+            self._send('S', 0)
+            return
+
+        command, speed = self.steer(result['best_gap'].angle)
+        if command == 'F':
+            scale = result.get('speed_scale', 1.0)
+            if scale <= 0.0:
+                command, speed = 'S', 0
+                self.obstacle_stops += 1
+            elif scale < 1.0:
+                speed = int(self.min_drive_pwm + (self.drive_pwm - self.min_drive_pwm) * scale)
+        self._send(command, speed)
+
+        sent = time.monotonic()
+        if self.latency_hist is not None:
+            self.latency_hist.observe((sent - result_time) * 1000.0)
+        if self.sensor_hist is not None and gap_time is not None:
+            self.sensor_hist.observe((sent - gap_time) * 1000.0)
+
+    def steer(self, angle):
+        """목표 각도(+ = 오른쪽) → (명령, PWM)
+
+        회전 중에는 데드밴드 절반까지 들어와야 직진으로 돌아간다 (떨림 방지)
+        """
+        band = self.deadband_deg
+        if self.command in ('L', 'R'):
+            band /= 2
+
+        if abs(angle) <= band:
+            return 'F', self.drive_pwm
+
+        ratio = min(1.0, abs(angle) / self.full_turn_deg)
+        pwm = int(self.min_turn_pwm + (self.max_turn_pwm - self.min_turn_pwm) * ratio)
+        return ('R' if angle > 0 else 'L'), pwm
+
+    def _send(self, command, speed):
+        self.command, self.speed = command, speed
+        self.link.send(command, speed)
@@ -0,0 +1,75 @@
+# fusion/frame_grabber.py
+
+import threading
+import time
+
+
+class FrameGrabber:
+    """최신 프레임만 유지하는 백그라운드 캡처 스레드
+
+    처리 속도와 무관하게 스트림을 계속 비워서 OpenCV 내부 버퍼에 오래된
+    프레임이 쌓이지 않게 한다. 소비되기 전에 덮어쓴 프레임은 dropped로 센다.
+    """
+
+    def __init__(self, cap):
+        self.cap = cap
+
+        # (frame, timestamp, seq) 튜플을 통째로 교체 → 읽는 쪽은 락 불필요
+        self._latest = None
+        self._consumed_seq = 0
+        self._cond = threading.Condition()
+
+        self.seq = 0
+        self.dropped = 0
+        self.read_failures = 0
+        self.read_hist = None   # 읽기+디코딩 지연 히스토그램 (선택)
+
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        while self._running:
+            t0 = time.perf_counter()
+            ret, frame = self.cap.read()
+            timestamp = time.monotonic()  # 디코딩 직후 시각
+            if self.read_hist is not None:
+                self.read_hist.observe_since(t0)
+
+            if not ret:
+                self.read_failures += 1
+                time.sleep(0.01)
+                continue
+
+            with self._cond:
+                self.seq += 1
+                if self._latest is not None and self._latest[2] > self._consumed_seq:
+                    self.dropped += 1
+                self._latest = (frame, timestamp, self.seq)
+                self._cond.notify_all()
+
+    def latest(self):
+        """최신 (frame, timestamp, seq) 또는 None (대기 없음)"""
+        item = self._latest
+        if item is not None:
+            self._consumed_seq = item[2]
+        return item
+
+    def wait_newer(self, seq, timeout=1.0):
+        """seq보다 새 프레임이 올 때까지 대기 후 latest() (시간 초과 시 None)"""
+        with self._cond:
+            ready = self._cond.wait_for(
+                lambda: self._latest is not None and self._latest[2] > seq,
+                timeout)
+        return self.latest() if ready else None
@@ -0,0 +1,108 @@
+# fusion/gap.py
+
+import numpy as np
+
+GAP_FIELDS = ('start', 'end', 'center', 'width', 'angle', 'confidence')
+
+
+class Gap:
+    """틈 하나 (슬롯 기반 경량 레코드)"""
+
+    __slots__ = GAP_FIELDS + ('index', 'track_id')
+
+    def __init__(self, start, end, center, width, angle, confidence, index=-1,
+                 track_id=-1):
+        self.start = start
+        self.end = end
+        self.center = center
+        self.width = width
+        self.angle = angle
+        self.confidence = confidence
+        self.index = index
+        self.track_id = track_id   # 추적기가 붙인 고정 ID (-1 = 추적 안 함)
+
+    def __getitem__(self, key):
+        # 기존 dict 접근(gap['angle']) 호환
+        return getattr(self, key)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in GAP_FIELDS}
+
+    def __repr__(self):
+        track = f" id={self.track_id}" if self.track_id >= 0 else ""
+        return (f"Gap(#{self.index}{track}, {self.start:.0f}-{self.end:.0f}px, "
+                f"{self.angle:+.1f}°, conf={self.confidence:.2f})")
+
+
+class GapBatch:
+    """프레임 하나의 틈 묶음
+
+    필드별 NumPy 열 배열을 갖고, Gap 객체는 인덱스로 접근할 때 한 번만 만든다.
+    같은 인덱스는 항상 같은 Gap 객체이므로 비교는 인덱스/동일성으로 한다.
+    """
+
+    __slots__ = GAP_FIELDS + ('timestamp', 'measured_time', 'track_ids', '_gaps')
+
+    def __init__(self, start, end, center, width, angle, confidence, timestamp=None):
+        self.start = start
+        self.end = end
+        self.center = center
+        self.width = width
+        self.angle = angle
+        self.confidence = confidence
+        self.timestamp = timestamp   # 탐지한 프레임의 캡처 시각 (monotonic)
+        self.measured_time = None    # GapTracker 출력이면 틈을 실제로 탐지한 최근 시각
+        self.track_ids = None        # GapTracker 출력이면 틈별 고정 ID 배열
+        self._gaps = [None] * len(start)
+
+    @classmethod
+    def from_spans(cls, starts, widths, frame_width, timestamp=None):
+        """가로 구간(시작, 폭)으로부터 중심/각도/신뢰도 계산"""
+        start = np.asarray(starts, dtype=np.float64)
+        width = np.asarray(widths, dtype=np.float64)
+        center = start + width / 2
+        angle = (center - frame_width / 2) / frame_width * 60
+        confidence = np.minimum(1.0, width / 300.0)
+        return cls(start, start + width, center, width, angle, confidence, timestamp)
+
+    @classmethod
+    def from_gaps(cls, gaps):
+        """Gap 또는 dict 리스트를 묶음으로 변환"""
+        columns = [np.fromiter((gap[field] for gap in gaps),
+                               dtype=np.float64, count=len(gaps))
+                   for field in GAP_FIELDS]
+        return cls(*columns)
+
+    @classmethod
+    def empty(cls):
+        return cls.from_spans((), (), 1)
+
+    @property
+    def measurement_time(self):
+        """틈을 실제로 측정한 시각 (추적기 예측 묶음이면 마지막 탐지 시각)"""
+        return self.measured_time if self.measured_time is not None else self.timestamp
+
+    def __len__(self):
+        return len(self._gaps)
+
+    def __bool__(self):
+        return len(self._gaps) > 0
+
+    def __getitem__(self, i):
+        gap = self._gaps[i]
+        if gap is None:
+            if i < 0:
+                i += len(self._gaps)
+            track_id = int(self.track_ids[i]) if self.track_ids is not None else -1
+            gap = Gap(float(self.start[i]), float(self.end[i]),
+                      float(self.center[i]), float(self.width[i]),
+                      float(self.angle[i]), float(self.confidence[i]), i, track_id)
+            self._gaps[i] = gap
+        return gap
+
+    def __iter__(self):
+        for i in range(len(self._gaps)):
+            yield self[i]
+
+    def __repr__(self):
+        return f"GapBatch({len(self)} gaps)"
@@ -0,0 +1,160 @@
+# fusion/gap_tracker.py
+
+import time
+import numpy as np
+
+from .gap import GapBatch
+
+
+class GapTracker:
+    """탐지 사이 프레임을 메우는 틈 추적기
+
+    탐지 결과를 기존 트랙과 구간 겹침(IoU) 또는 중심 거리로 연결하고,
+    중심/폭을 알파-베타 필터로 평활화한다. 탐지가 없는 프레임에서는
+    속도로 위치를 예측하며, 트랙마다 고정 ID를 붙인다.
+    마지막 탐지 후 max_coast초가 지난 트랙은 미탐지 횟수와 상관없이 버린다.
+    예측 묶음의 timestamp는 요청 시각이고, measured_time은 보이는 트랙들의
+    가장 최근 실제 탐지 시각이다 (융합/제어의 신선도 판단용).
+    상태는 트랙별 NumPy 열 배열로 보관한다 (GapBatch와 같은 방식).
+    """
+
+    def __init__(self, alpha=0.5, beta=0.2, min_iou=0.2, max_center_jump=80.0,
+                 max_misses=3, max_coast=0.5, min_hits=1, coast_decay=0.8):
+        self.alpha = alpha                      # 위치 보정 비율
+        self.beta = beta                        # 속도 보정 비율
+        self.min_iou = min_iou                  # 이 이상 겹치면 같은 틈
+        self.max_center_jump = max_center_jump  # 겹침이 부족할 때 허용하는 중심 이동 (px)
+        self.max_misses = max_misses            # 연속 미탐지 허용 횟수
+        self.max_coast = max_coast              # 최대 예측 구간 (초)
+        self.min_hits = min_hits                # 이만큼 탐지돼야 출력
+        self.coast_decay = coast_decay          # 미탐지 1회당 신뢰도 배율
+
+        self.frame_width = 1
+        self._next_id = 0
+        self.reset()
+
+    def reset(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.center = np.empty(0)
+        self.width = np.empty(0)
+        self.v_center = np.empty(0)   # px/s
+        self.v_width = np.empty(0)    # px/s
+        self.time = np.empty(0)       # 마지막 보정 시각 (monotonic)
+        self.hits = np.empty(0, dtype=np.int64)
+        self.misses = np.empty(0, dtype=np.int64)
+        self.detect_time = None       # 마지막 update() 시각
+
+    def __len__(self):
+        return len(self.ids)
+
+    def is_fresh(self, track_id):
+        """트랙이 남아 있고 마지막 탐지에서도 잡혔는지"""
+        i = np.flatnonzero(self.ids == track_id)
+        return len(i) > 0 and self.misses[i[0]] == 0
+
+    def _extrapolate(self, timestamp):
+        dt = np.clip(timestamp - self.time, 0.0, self.max_coast)
+        center = self.center + self.v_center * dt
+        width = np.maximum(self.width + self.v_width * dt, 1.0)
+        return center, width
+
+    def _associate(self, pred_center, pred_width, gaps):
+        """(트랙, 탐지) 짝 목록 - 친화도 높은 순으로 탐욕 매칭"""
+        if len(self.ids) == 0 or len(gaps) == 0:
+            return []
+
+        track_start = (pred_center - pred_width / 2)[:, None]
+        track_end = (pred_center + pred_width / 2)[:, None]
+        det_start = gaps.start[None, :]
+        det_end = gaps.end[None, :]
+
+        inter = np.maximum(np.minimum(track_end, det_end)
+                           - np.maximum(track_start, det_start), 0.0)
+        union = (track_end - track_start) + (det_end - det_start) - inter
+        iou = inter / np.maximum(union, 1e-9)
+        dist = np.abs(pred_center[:, None] - gaps.center[None, :])
+
+        # 겹침이 충분하면 IoU, 아니면 가까울수록 min_iou 아래의 값 (없으면 음수)
+        affinity = np.where(
+            iou >= self.min_iou, iou,
+            np.where(dist <= self.max_center_jump,
+                     self.min_iou * (1.0 - dist / self.max_center_jump), -1.0))
+
+        pairs = []
+        for _ in range(min(affinity.shape)):
+            i, j = np.unravel_index(int(np.argmax(affinity)), affinity.shape)
+            if affinity[i, j] <= 0.0:
+                break
+            pairs.append((i, j))
+            affinity[i, :] = -1.0
+            affinity[:, j] = -1.0
+        return pairs
+
+    def update(self, gaps, frame_width, timestamp=None):
+        """새 탐지 결과 반영 → 평활화된 GapBatch"""
+        if timestamp is None:
+            timestamp = gaps.timestamp if gaps.timestamp is not None else time.monotonic()
+        self.frame_width = frame_width
+        self.detect_time = timestamp
+
+        pred_center, pred_width = self._extrapolate(timestamp)
+        pairs = self._associate(pred_center, pred_width, gaps)
+
+        matched = np.zeros(len(self.ids), dtype=bool)
+        used = np.zeros(len(gaps), dtype=bool)
+        for i, j in pairs:
+            dt = timestamp - self.time[i]
+            r_center = gaps.center[j] - pred_center[i]
+            r_width = gaps.width[j] - pred_width[i]
+
+            self.center[i] = pred_center[i] + self.alpha * r_center
+            self.width[i] = pred_width[i] + self.alpha * r_width
+            if dt > 0:
+                self.v_center[i] += self.beta / dt * r_center
+                self.v_width[i] += self.beta / dt * r_width
+            self.time[i] = timestamp
+            self.hits[i] += 1
+            matched[i] = used[j] = True
+
+        # 놓친 트랙은 예측만 유지하다가 max_misses나 max_coast초를 넘으면 제거
+        self.misses[~matched] += 1
+        self.misses[matched] = 0
+        keep = (self.misses <= self.max_misses) & (timestamp - self.time <= self.max_coast)
+
+        new = np.flatnonzero(~used)
+        n_new = len(new)
+        self.ids = np.concatenate((self.ids[keep],
+                                   np.arange(self._next_id, self._next_id + n_new)))
+        self._next_id += n_new
+        self.center = np.concatenate((self.center[keep], gaps.center[new]))
+        self.width = np.concatenate((self.width[keep], gaps.width[new]))
+        self.v_center = np.concatenate((self.v_center[keep], np.zeros(n_new)))
+        self.v_width = np.concatenate((self.v_width[keep], np.zeros(n_new)))
+        self.time = np.concatenate((self.time[keep], np.full(n_new, float(timestamp))))
+        self.hits = np.concatenate((self.hits[keep], np.ones(n_new, dtype=np.int64)))
+        self.misses = np.concatenate((self.misses[keep], np.zeros(n_new, dtype=np.int64)))
+
+        return self.predict(timestamp)
+
+    def predict(self, timestamp=None):
+        """timestamp 시각의 틈 예측 (왼쪽부터 정렬, track_ids 포함)"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        visible = np.flatnonzero((self.hits >= self.min_hits)
+                                 & (timestamp - self.time <= self.max_coast))
+        center, width = self._extrapolate(timestamp)
+        start = np.clip(center - width / 2, 0, self.frame_width)
+        end = np.clip(center + width / 2, 0, self.frame_width)
+
+        # 화면 밖으로 예측된 트랙은 제외, 왼쪽부터 정렬
+        visible = visible[end[visible] - start[visible] >= 1.0]
+        visible = visible[np.argsort(start[visible], kind='stable')]
+
+        batch = GapBatch.from_spans(start[visible], end[visible] - start[visible],
+                                    self.frame_width, timestamp)
+        batch.confidence *= self.coast_decay ** self.misses[visible]
+        batch.track_ids = self.ids[visible]
+        batch.measured_time = (float(self.time[visible].max()) if len(visible)
+                               else self.detect_time)
+        return batch
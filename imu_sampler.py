@@ -0,0 +1,114 @@
+# fusion/imu_sampler.py
+
+import time
+import logging
+import threading
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+def wrap_angle(angle):
+    """각도를 [-180, 180) 범위로"""
+    return (angle + 180.0) % 360.0 - 180.0
+
+
+class YawSampler:
+    """IMU yaw 백그라운드 샘플러 (단일 생산자, 락 없음)
+
+    별도 스레드가 일정 주기로 tracker.update_yaw_combined()를 호출하고
+    (시각, yaw)를 고정 크기 이력에 쌓는다. 음향 경로는 I2C를 기다리지 않고
+    yaw_at(t)로 원하는 시각의 yaw를 보간해서 쓴다.
+    """
+
+    def __init__(self, tracker, rate_hz=100.0, history_seconds=2.0, recorder=None):
+        self.tracker = tracker
+        self.period = 1.0 / rate_hz
+        self.recorder = recorder
+
+        size = max(int(rate_hz * history_seconds), 8)
+        self._times = np.zeros(size, dtype=np.float64)
+        self._yaws = np.zeros(size, dtype=np.float64)
+        self.count = 0            # 지금까지 쌓은 샘플 수 (데이터를 쓴 뒤 증가)
+        self.read_failures = 0
+
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def sample(self):
+        """IMU를 한 번 읽어 이력에 추가 (샘플러 스레드 전용)"""
+        t0 = time.monotonic()
+        self.tracker.update_yaw_combined()
+        yaw = float(self.tracker.current_yaw)
+        timestamp = (t0 + time.monotonic()) / 2   # I2C 왕복의 중간 시각
+
+        i = self.count % len(self._times)
+        self._times[i] = timestamp
+        self._yaws[i] = yaw
+        self.count += 1
+
+        if self.recorder is not None:
+            self.recorder.record_yaw(yaw, timestamp)
+        return yaw
+
+    def _run(self):
+        next_time = time.monotonic()
+        while self._running:
+            try:
+                self.sample()
+            except Exception:
+                self.read_failures += 1
+                log.exception("IMU 읽기 오류")
+
+            next_time += self.period
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_time = time.monotonic()   # 밀렸으면 주기를 다시 맞춤
+
+    @property
+    def current_yaw(self):
+        """가장 최근 샘플의 yaw"""
+        count = self.count
+        if count == 0:
+            return float(self.tracker.current_yaw)
+        return float(self._yaws[(count - 1) % len(self._yaws)])
+
+    def yaw_at(self, t):
+        """monotonic 시각 t의 yaw (앞뒤 샘플 선형 보간, 이력 범위 밖이면 끝 값)"""
+        count = self.count
+        if count == 0:
+            return float(self.tracker.current_yaw)
+
+        # 읽는 동안 덮어쓸 수 있는 가장 오래된 칸은 제외
+        size = len(self._times)
+        k = min(count, size - 2)
+        idx = np.arange(count - k, count) % size
+        times = self._times[idx]
+        yaws = self._yaws[idx]
+
+        j = int(np.searchsorted(times, t))
+        if j == 0:
+            return float(yaws[0])
+        if j >= k:
+            return float(yaws[-1])
+
+        t0, t1 = times[j - 1], times[j]
+        y0 = yaws[j - 1]
+        dy = wrap_angle(yaws[j] - y0)   # ±180 경계를 넘는 회전
+        frac = (t - t0) / (t1 - t0) if t1 > t0 else 1.0
+        return float(wrap_angle(y0 + dy * frac))
@@ -0,0 +1,91 @@
+# fusion/logger.py
+
+import sys
+import queue
+import logging
+import threading
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+
+PACKAGE_LOGGER = 'fusion'
+
+_listener = None
+
+
+class RingBufferQueue:
+    """가득 차면 가장 오래된 항목을 버리는 큐 (QueueHandler/QueueListener용)"""
+
+    def __init__(self, capacity=10000):
+        self._items = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put_nowait(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def put(self, item, block=True, timeout=None):
+        self.put_nowait(item)
+
+    def get(self, block=True, timeout=None):
+        with self._cond:
+            if block:
+                self._cond.wait_for(lambda: self._items, timeout)
+            if not self._items:
+                raise queue.Empty
+            return self._items.popleft()
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """레코드를 포맷하지 않고 그대로 큐에 넣음 (포맷은 리스너 스레드에서)"""
+
+    def prepare(self, record):
+        return record
+
+
+def get_logger(name=None):
+    return logging.getLogger(f"{PACKAGE_LOGGER}.{name}" if name else PACKAGE_LOGGER)
+
+
+def configure_logging(level='INFO', background=False, capacity=10000, stream=None):
+    """fusion 패키지 로거 설정
+
+    level 미만 메시지는 포맷 전에 걸러진다. background=True면 핫 스레드는
+    링 버퍼에 레코드만 넣고, 별도 스레드가 포맷과 출력을 맡는다
+    (밀리면 오래된 레코드부터 버림).
+    """
+    global _listener
+
+    logger = logging.getLogger(PACKAGE_LOGGER)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    sink = logging.StreamHandler(stream or sys.stdout)
+    sink.setFormatter(logging.Formatter('%(message)s'))
+
+    if background:
+        ring = RingBufferQueue(capacity)
+        logger.addHandler(_DeferredQueueHandler(ring))
+        _listener = QueueListener(ring, sink)
+        _listener.start()
+    else:
+        logger.addHandler(sink)
+
+    return logger
+
+
+def shutdown_logging():
+    """백그라운드 출력 스레드를 멈추고 남은 레코드를 모두 출력"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -10,9 +10,13 @@ import time
 import cv2
 from fusion.sensor_wrapper import AudioSensorWrapper, CameraSensorWrapper
 from fusion.adaptive_fusion import AdaptiveFusion
+from fusion.logger import configure_logging
 
 
 def main():
+    # 대화형 실행: 융합 점수와 음향 디버그 출력을 모두 표시
+    configure_logging('DEBUG')
+
     print("🚀 2센서 적응형 융합 시스템 시작\n")
 
     # 센서 초기화
@@ -51,12 +55,12 @@ def main():
                 continue
 
             # 틈
-            gaps, frame = camera_sensor.get_gaps_with_angles()
+            gaps, frame, _ = camera_sensor.get_gaps_with_angles()
 
             if gaps:
                 print(f"\n📷 틈 {len(gaps)}개 탐지:")
                 for i, gap in enumerate(gaps):
-                    print(f"   #{i}: 각도 {gap['angle']:+.1f}°, 폭 {gap['width']:.0f}px")
+                    print(f"   #{i}: 각도 {gap.angle:+.1f}°, 폭 {gap.width:.0f}px")
             else:
                 print("\n📷 틈 없음")
                 time.sleep(0.5)
@@ -96,7 +100,7 @@ def visualize_result(frame, gaps, result, audio_data):
         gap = gap_score['gap']
 
         # 색상 (1순위=초록, 나머지=노랑)
-        if gap == result['best_gap']:
+        if gap is result['best_gap']:
             color = (0, 255, 0)  # 초록
             thickness = 5
         else:
@@ -106,14 +110,14 @@ def visualize_result(frame, gaps, result, audio_data):
         # 틈 박스
         y_top = int(h * 0.6)
         cv2.rectangle(vis,
-                      (int(gap['start']), y_top),
-                      (int(gap['end']), h),
+                      (int(gap.start), y_top),
+                      (int(gap.end), h),
                       color, thickness)
 
         # 점수 표시
         cv2.putText(vis,
                     f"#{i + 1}: {gap_score['total_score']:.2f}",
-                    (int(gap['center']), y_top - 10),
+                    (int(gap.center), y_top - 10),
                     cv2.FONT_HERSHEY_SIMPLEX,
                     0.6, color, 2)
 
@@ -3,217 +3,194 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 import time
-import cv2
+import argparse
 import threading
-from flask import Flask, Response
+from flask import Flask, Response, jsonify
 from fusion.sensor_wrapper import AudioSensorWrapper, CameraSensorWrapper
 from fusion.adaptive_fusion import AdaptiveFusion
-
-# 전역 변수
-latest_frame = None
-latest_result = None
-frame_lock = threading.Lock()
+from fusion.broadcast import FrameBroadcaster
+from fusion.metrics import MetricsRegistry
+from fusion.logger import configure_logging, shutdown_logging
+from fusion.pipeline import FusionStage
+from fusion.gap_tracker import GapTracker
+from fusion.detect_scheduler import DetectionScheduler
+from fusion.visualize import visualize_fast, GAP_DETECTOR, PROJECTION_SCALE, TARGET_FPS
+from fusion.sensor_record import (SessionRecorder, SessionReader, ReplayClock,
+                                  ReplayCapture, ReplayAudioSource, ReplayTracker)
+
+# 세션 기록기 / 재생 세션 (실행 인자로 설정)
+recorder = None
+replay_reader = None
+replay_clock = None
+
+# 자율 주행 (--drive로 시리얼 포트를 주면 사용)
+drive_link = None
+drive_controller = None
+
+# 단계별 지연 계측 (/metrics, /metrics.json)
+metrics = MetricsRegistry()
+m_capture = metrics.histogram('capture_wait_ms', "카메라 프레임 대기")
+m_decode = metrics.histogram('decode_ms', "MJPEG 읽기+디코딩 (그래버 스레드)")
+m_detect = metrics.histogram('detect_ms', "틈 탐지")
+m_fuse = metrics.histogram('fuse_ms', "융합")
+m_skew = metrics.histogram('fusion_skew_ms', "융합에 쓴 음향-틈 시각 차")
+m_render = metrics.histogram('render_ms', "시각화")
+m_loop = metrics.histogram('camera_loop_ms', "카메라 루프 1회")
+m_audio = metrics.histogram('audio_process_ms', "hop 묶음 음향 처리")
+m_encode = metrics.histogram('encode_ms', "JPEG 인코딩")
+m_age = metrics.histogram('frame_age_ms', "전송 시점 프레임 나이 (캡처 기준)")
+c_frames = metrics.counter('frames_total', "처리한 카메라 프레임")
+c_detections = metrics.counter('detections_total', "틈 탐지 실행 횟수")
+c_bearings = metrics.counter('audio_bearings_total', "음향 방위 추정 수")
+
+# 음향/틈 최신값 채널 + 둘 중 하나가 바뀌면 실행되는 융합 단계
+fusion_stage = FusionStage(AdaptiveFusion(), fuse_hist=m_fuse, skew_hist=m_skew)
+
+# 시각화 프레임 방송 (프레임당 JPEG 인코딩 1회, 모든 시청자 공유)
+broadcaster = FrameBroadcaster(quality=70, encode_hist=m_encode, age_hist=m_age)
+metrics.gauge('stream_subscribers', lambda: broadcaster.subscribers, "영상 시청자 수")
+metrics.counter_func('jpeg_encodes_total', lambda: broadcaster.encodes, "JPEG 인코딩 횟수")
 
 app = Flask(__name__)
 
 
 def audio_loop():
-    """음향 센서 전용 루프 (별도 스레드)"""
-    global latest_result
-
-    audio_sensor = AudioSensorWrapper()
+    """음향 센서 전용 루프 (별도 스레드, 링 버퍼에 새 hop이 쌓이면 깨어남)"""
+    # 스트림을 한 번만 열고 링 버퍼에서 최신 구간을 읽음
+    if replay_reader is not None:
+        audio_sensor = AudioSensorWrapper(
+            streaming=True,
+            source=ReplayAudioSource(replay_reader, replay_clock),
+            tracker=ReplayTracker(replay_reader, replay_clock),
+            imu_rate=100.0
+        )
+    else:
+        audio_sensor = AudioSensorWrapper(streaming=True, recorder=recorder, imu_rate=100.0)
+    audio_sensor.process_hist = m_audio
+    metrics.counter_func('audio_overflows_total', lambda: audio_sensor.ring.overflows,
+                         "오디오 입력 오버플로")
+    metrics.counter_func('audio_skipped_hops_total', lambda: audio_sensor.doa.skipped,
+                         "밀려서 건너뛴 hop")
+    metrics.counter_func('imu_read_failures_total', lambda: audio_sensor.imu.read_failures,
+                         "IMU 읽기 실패")
+    metrics.counter_func('audio_gated_frames_total', lambda: audio_sensor.noise.gated,
+                         "소음 바닥 이하로 GCC-PHAT를 건너뛴 프레임")
+    metrics.gauge('audio_noise_floor_rms', lambda: audio_sensor.noise.level,
+                  "추정 배경 소음 RMS")
     print("✅ 음향 센서 시작")
 
     while True:
         try:
-            audio_data = audio_sensor.get_audio_data()
-
-            if audio_data:
-                with frame_lock:
-                    if latest_result:
-                        latest_result['audio'] = audio_data
+            # hop마다 쌓인 방위를 모두 이력에 넣음 (틈 프레임 시각에 맞춰 골라 씀)
+            readings = audio_sensor.get_audio_stream()
+            c_bearings.inc(len(readings))
+            fusion_stage.put_audio_readings(readings)
         except Exception as e:
             print(f"음향 오류: {e}")
             time.sleep(0.1)
 
 
 def camera_loop():
-    """카메라 센서 전용 루프 (메인 스레드)"""
-    global latest_frame, latest_result
-
+    """카메라 센서 전용 루프 (별도 스레드, 새 프레임이 오면 깨어남)"""
     print("🚀 카메라 시스템 시작\n")
 
-    camera_sensor = CameraSensorWrapper(
-        stream_url="http://172.20.10.6:8080/?action=stream"
-    )
-    fusion = AdaptiveFusion()
+    if replay_reader is not None:
+        # 재생: 모든 프레임을 순서대로 처리
+        camera_sensor = CameraSensorWrapper(
+            capture=ReplayCapture(replay_reader, replay_clock),
+            detector=GAP_DETECTOR,
+            projection_scale=PROJECTION_SCALE
+        )
+    else:
+        camera_sensor = CameraSensorWrapper(
+            stream_url="http://172.20.10.6:8080/?action=stream",
+            detector=GAP_DETECTOR,
+            projection_scale=PROJECTION_SCALE,
+            threaded=True,  # 최신 프레임만 처리 (지연 누적 방지)
+            recorder=recorder
+        )
+    if camera_sensor.grabber is not None:
+        camera_sensor.grabber.read_hist = m_decode
+        metrics.counter_func('dropped_frames_total', lambda: camera_sensor.grabber.dropped,
+                             "처리 전에 덮어쓴 프레임")
 
     print("✅ 카메라 초기화 완료\n")
 
-    frame_count = 0
-    yolo_interval = 3  # YOLO는 3프레임마다만 실행
-    last_gaps = []
-    last_debug = None
+    gap_tracker = GapTracker()   # 탐지 사이 프레임은 추적기 예측
+    scheduler = DetectionScheduler(target_fps=TARGET_FPS)
+    metrics.gauge('detect_interval', lambda: scheduler.interval, "현재 탐지 간격 (프레임)")
+    for reason in scheduler.triggers:
+        metrics.counter_func(f'detect_trigger_{reason}_total',
+                             lambda reason=reason: scheduler.triggers[reason],
+                             f"탐지 실행 사유: {reason}")
+    debug_info = None
+    best_id = -1
 
     try:
         while True:
-            frame_count += 1
-
-            # === 프레임 읽기 (빠름!) ===
-            ret, frame = camera_sensor.cap.read()
-            if not ret:
-                time.sleep(0.01)
+            # === 프레임 읽기 (한 번만 디코딩, 탐지/시각화 공유) ===
+            t0 = time.perf_counter()
+            frame = camera_sensor.read_frame()
+            m_capture.observe_since(t0)
+            if frame is None:
+                time.sleep(0.01)  # 스트림 오류 시에만 잠시 쉼
                 continue
+            t_loop = time.perf_counter()
+            c_frames.inc()
+
+            # === 탐지는 스케줄러가 정한 프레임에서만 (부하/장면 변화 기준) ===
+            detect_now = scheduler.should_detect(frame)
+            if detect_now:
+                t0 = time.perf_counter()
+                detected, debug_info = camera_sensor.detect_gaps(frame)
+                detect_ms = (time.perf_counter() - t0) * 1000.0
+                m_detect.observe(detect_ms)
+                scheduler.record_detection(detect_ms)
+                c_detections.inc()
+                gaps = gap_tracker.update(detected, frame.shape[1], camera_sensor.frame_time)
+
+                # 최선 틈을 놓쳤으면 다음 프레임에 다시 탐지
+                if best_id >= 0 and not gap_tracker.is_fresh(best_id):
+                    scheduler.request()
+            else:
+                gaps = gap_tracker.predict(camera_sensor.frame_time)
 
-            # === YOLO는 N프레임마다만 (느림 방지) ===
-            if frame_count % yolo_interval == 0:
-                gaps, _, debug_info = camera_sensor.get_gaps_with_angles()
-                if gaps:
-                    last_gaps = gaps
-                    last_debug = debug_info
-
-            # === 융합 (최신 데이터) ===
-            result_data = {
-                'audio': None,
-                'gaps': last_gaps,
-                'result': None
-            }
+            # 매 프레임 틈(탐지 또는 예측) → 융합 단계가 이 스레드에서 바로 실행됨
+            # (트랙이 모두 사라지면 빈 묶음이 들어가 화면에서도 지워짐)
+            fusion_stage.put_gaps(gaps, debug_info, camera_sensor.frame_time)
 
-            with frame_lock:
-                if latest_result and latest_result.get('audio'):
-                    result_data['audio'] = latest_result['audio']
-
-            # 융합 실행
-            if result_data['audio'] and last_gaps:
-                try:
-                    result_data['result'] = fusion.fuse(
-                        result_data['audio'],
-                        last_gaps
-                    )
-                except:
-                    pass
-
-            # === 시각화 (빠름!) ===
+            # === 시각화 (융합에 쓰인 음향·틈·결과 스냅샷) ===
+            snapshot = fusion_stage.result.value or {}
+            result = snapshot.get('result')
+            best_id = result['best_gap'].track_id if result else -1
+            t0 = time.perf_counter()
             vis_frame = visualize_fast(
                 frame,
-                last_gaps,
-                result_data['result'],
-                result_data['audio'],
-                last_debug
+                snapshot.get('gaps') or [],
+                result,
+                snapshot.get('audio'),
+                snapshot.get('debug')
             )
+            m_render.observe_since(t0)
 
-            # 전역 변수 업데이트
-            with frame_lock:
-                latest_frame = vis_frame
-                latest_result = result_data
-
-            # === 짧은 대기만! ===
-            time.sleep(0.01)  # 0.3초 → 0.01초 (100 FPS 가능)
+            broadcaster.publish(vis_frame, camera_sensor.frame_time)
+            loop_ms = (time.perf_counter() - t_loop) * 1000.0
+            m_loop.observe(loop_ms)
+            if not detect_now:
+                scheduler.record_frame(loop_ms)
 
     except Exception as e:
         print(f"\n❌ 카메라 오류: {e}")
     finally:
-        camera_sensor.cap.release()
+        camera_sensor.release()
+        if camera_sensor.grabber is not None:
+            print(f"   버린 프레임: {camera_sensor.grabber.dropped}")
         print("\n⏹️  카메라 루프 종료")
 
 
-def visualize_fast(frame, gaps, result, audio_data, debug_info):
-    """최적화된 시각화 (간단하게!)"""
-    vis = frame.copy()
-    h, w, _ = vis.shape
-
-    roi_top = debug_info['roi_top'] if debug_info else int(h * 0.6)
-    roi_bottom = h
-    # === 1. 틈 시각화 ===
-    if gaps:
-        overlay = vis.copy()
-
-        for i, gap in enumerate(gaps):
-            is_best = (result and gap == result['best_gap'])
-
-            if is_best:
-                color = (0, 255, 0)      # 초록
-                thickness = 6
-            elif i == 1:
-                color = (0, 165, 255)    # 주황
-                thickness = 4
-            else:
-                color = (255, 200, 0)    # 하늘색
-                thickness = 2
-
-            # 채우기
-            cv2.rectangle(overlay,
-                         (int(gap['start']), roi_top),
-                         (int(gap['end']), roi_bottom),
-                         color, -1)
-
-            # 테두리
-            cv2.rectangle(vis,
-                         (int(gap['start']), roi_top),
-                         (int(gap['end']), roi_bottom),
-                         color, thickness)
-
-            # 순위 번호
-            rank_text = f"#{i+1}"
-            cv2.putText(vis, rank_text,
-                       (int(gap['center']) - 20, roi_top - 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 1.0, color, 3)
-
-        # 반투명 효과
-        vis = cv2.addWeighted(vis, 0.5, overlay, 0.5, 0)
-
-    # === 2. ROI 경계선 ===
-    cv2.line(vis, (0, roi_top), (w, roi_top), (0, 255, 255), 2)
-    cv2.putText(vis, "ROI", (10, roi_top - 10),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-
-    # === 3. 상태 정보 ===
-    cv2.rectangle(vis, (5, 5), (450, 100), (0, 0, 0), -1)
-    cv2.rectangle(vis, (5, 5), (450, 100), (255, 255, 255), 2)
-
-    if gaps:
-        best_gap = result['best_gap'] if result else gaps[0]
-        gap_text = f"Best: {best_gap['angle']:+.1f}deg ({best_gap['width']:.0f}px)"
-        cv2.putText(vis, gap_text, (15, 35),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-    else:
-        cv2.putText(vis, "NO GAP DETECTED", (15, 35),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-
-    if audio_data:
-        mode = result['mode'] if result else "N/A"
-        mode_text = "AUDIO" if mode == 'audio_trust' else "VISUAL"
-        audio_text = f"{mode_text} | {audio_data['angle']:+.1f}deg | SNR:{audio_data['snr']:.1f}dB"
-        color = (0, 255, 0) if audio_data['snr'] > 10 else (0, 165, 255)
-        cv2.putText(vis, audio_text, (15, 70),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-    else:
-        cv2.putText(vis, "No Audio", (15, 70),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (128, 128, 128), 2)
-
-    return vis
-
 def generate_frames():
-    """MJPEG 스트리밍 (최적화)"""
-    while True:
-        with frame_lock:
-            if latest_frame is None:
-                time.sleep(0.01)
-                continue
-            frame = latest_frame.copy()
-
-        # JPEG 인코딩 (품질 낮춰서 속도 UP)
-        encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 70]
-        ret, buffer = cv2.imencode('.jpg', frame, encode_param)
-
-        if not ret:
-            continue
-
-        frame_bytes = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-
-        time.sleep(0.02)  # 50 FPS
+    """MJPEG 스트리밍 (새 프레임이 올 때만 깨어나고, 밀리면 최신으로 건너뜀)"""
+    return broadcaster.frames()
 
 
 @app.route('/')
@@ -265,7 +242,45 @@ def video_feed():
                    mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
+@app.route('/metrics')
+def metrics_prometheus():
+    """Prometheus 텍스트 형식"""
+    return Response(metrics.render_prometheus(),
+                   mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/metrics.json')
+def metrics_json():
+    return jsonify(metrics.to_dict())
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RC카 고속 융합 스트리밍 서버")
+    parser.add_argument('--record', metavar='DIR',
+                        help="센서 데이터를 세션 폴더에 기록")
+    parser.add_argument('--replay', metavar='DIR',
+                        help="기록된 세션을 센서 대신 재생")
+    parser.add_argument('--fast', action='store_true',
+                        help="재생 시 실시간 대신 최대 속도로")
+    parser.add_argument('--drive', metavar='PORT',
+                        help="융합 결과로 RC카 자율 주행 (아두이노 시리얼 포트)")
+    parser.add_argument('--drive-rate', type=float, default=20.0,
+                        help="주행 제어 주기 (Hz)")
+    parser.add_argument('--log-level', default='INFO',
+                        help="fusion 로그 레벨 (DEBUG면 프레임별 융합 점수 출력)")
+    args = parser.parse_args()
+
+    # 핫 루프의 로그는 링 버퍼에만 넣고 출력은 별도 스레드에서
+    configure_logging(args.log_level, background=True)
+
+    if args.replay:
+        replay_reader = SessionReader(args.replay)
+        replay_clock = ReplayClock(replay_reader.start_time(), realtime=not args.fast)
+        print(f"▶️  세션 재생: {args.replay}")
+    elif args.record:
+        recorder = SessionRecorder(args.record)
+        print(f"⏺️  세션 기록: {args.record}")
+
     # 음향 센서 별도 스레드
     audio_thread = threading.Thread(target=audio_loop, daemon=True)
     audio_thread.start()
@@ -276,6 +291,51 @@ if __name__ == "__main__":
     camera_thread.start()
     time.sleep(2)
 
+    # 자율 주행 제어 루프 (융합 결과 → 모터 명령, 고정 주기)
+    if args.drive:
+        from fusion.serial_link import MotorLinkThread, FRAME_TELEMETRY
+        from fusion.drive_controller import DriveController
+        from fusion.telemetry import DistanceRing
+
+        drive_link = MotorLinkThread(
+            args.drive, ack_hist=metrics.histogram('motor_ack_ms', "명령 → ACK 왕복"))
+        drive_link.start()
+
+        # 아두이노 초음파 텔레메트리 → 융합의 세 번째 입력 (감속/정지)
+        distance_ring = DistanceRing()
+        drive_link.on_frame(FRAME_TELEMETRY, distance_ring.on_frame)
+        fusion_stage.distance_source = distance_ring
+        metrics.gauge('ultrasonic_distance_cm',
+                      lambda: (distance_ring.latest() or {}).get('distance', -1),
+                      "최근 초음파 거리")
+        metrics.counter_func('ultrasonic_dropped_total', lambda: distance_ring.dropped,
+                             "누락된 텔레메트리 프레임")
+        metrics.counter_func('firmware_hard_stops_total', lambda: distance_ring.hard_stops,
+                             "아두이노가 직접 정지시킨 횟수")
+        metrics.counter_func('firmware_watchdog_stops_total', lambda: distance_ring.watchdog_stops,
+                             "명령이 끊겨 아두이노 워치독이 정지시킨 횟수")
+
+        drive_controller = DriveController(
+            fusion_stage.result, drive_link, rate_hz=args.drive_rate,
+            jitter_hist=metrics.histogram('drive_jitter_ms', "제어 주기 기상 지연"),
+            latency_hist=metrics.histogram('drive_latency_ms', "융합 결과 → 명령 전송"),
+            sensor_hist=metrics.histogram('drive_sensor_latency_ms', "캡처 → 명령 전송")
+        )
+        metrics.counter_func('drive_missed_deadlines_total',
+                             lambda: drive_controller.missed_deadlines, "놓친 제어 주기")
+        metrics.counter_func('drive_failsafe_stops_total',
+                             lambda: drive_controller.failsafe_stops, "failsafe 정지 명령")
+        metrics.counter_func('drive_obstacle_stops_total',
+                             lambda: drive_controller.obstacle_stops, "전방 거리로 인한 정지 명령")
+        metrics.counter_func('motor_commands_acked_total', lambda: drive_link.link.acked,
+                             "ACK 받은 모터 명령")
+        metrics.counter_func('motor_commands_failed_total', lambda: drive_link.link.failed,
+                             "ACK 없이 포기한 모터 명령")
+        metrics.counter_func('motor_commands_coalesced_total', lambda: drive_link.link.coalesced,
+                             "전송 전에 새 명령으로 대체된 명령")
+        drive_controller.start()
+        print(f"🏎️  자율 주행: {args.drive} ({args.drive_rate:.0f}Hz)")
+
     # Flask 서버 시작
     print("\n" + "=" * 60)
     print("🌐 고속 웹 스트리밍 서버!")
@@ -283,9 +343,18 @@ if __name__ == "__main__":
     print("\n📺 http://172.20.10.6:5000")
     print("\n🚀 최적화:")
     print("   • 멀티스레딩 (음향 | 카메라 분리)")
-    print("   • YOLO 3프레임마다")
-    print("   • 대기시간 최소화 (0.01초)")
+    print(f"   • 탐지 주기 자동 조절 (목표 {TARGET_FPS:.0f}FPS, 사이 프레임은 틈 추적기 예측)")
+    print("   • 이벤트 구동 (고정 대기 없음)")
     print("   • 간소화된 시각화")
     print("\n종료: Ctrl+C\n")
 
-    app.run(host='0.0.0.0', port=5000, threaded=True, debug=False)
+    try:
+        app.run(host='0.0.0.0', port=5000, threaded=True, debug=False)
+    finally:
+        if drive_controller is not None:
+            drive_controller.stop()
+            drive_link.stop()
+        if recorder is not None:
+            recorder.close()
+            print(f"⏺️  기록 종료 (누락: {recorder.dropped})")
+        shutdown_logging()
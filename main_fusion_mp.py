@@ -0,0 +1,297 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+import argparse
+import threading
+import multiprocessing as mp
+from flask import Flask, Response, jsonify
+from fusion.sensor_wrapper import AudioSensorWrapper, CameraSensorWrapper
+from fusion.adaptive_fusion import AdaptiveFusion
+from fusion.broadcast import FrameBroadcaster
+from fusion.metrics import MetricsRegistry
+from fusion.logger import configure_logging, shutdown_logging
+from fusion.pipeline import FusionStage
+from fusion.shm_ring import SharedFrameRing, SharedRecord
+from fusion.gap_tracker import GapTracker
+from fusion.detect_scheduler import DetectionScheduler
+from fusion.visualize import visualize_fast, GAP_DETECTOR, PROJECTION_SCALE, TARGET_FPS
+
+# 멀티프로세스 배치 (GIL 분리, 보드의 모든 코어 사용)
+#   음향 프로세스   : 스트림 → GCC-PHAT → 음향 레코드
+#   카메라 프로세스 : 캡처 → 틈 탐지 → 융합 → 시각화 → 프레임 링 + 결과 레코드
+#   웹 프로세스(본체): 프레임 링 → JPEG 인코딩 → Flask
+# 프레임은 공유 메모리 슬롯으로, 결과는 고정 레이아웃 레코드로만 오간다 (pickle 없음)
+
+STREAM_URL = "http://172.20.10.6:8080/?action=stream"
+
+AUDIO_FIELDS = ('time', 'angle', 'snr', 'confidence', 'raw_angle')
+RESULT_FIELDS = ('time', 'frame_time', 'n_gaps', 'best_index', 'best_angle',
+                 'best_width', 'score', 'audio_trust', 'audio_angle', 'audio_snr',
+                 'audio_weight', 'audio_age', 'gap_age', 'skew')
+
+# fork로 자식에게 넘어가는 공유 객체 (본체에서 생성)
+frame_ring = None
+frame_cond = None
+audio_record = None
+result_record = None
+stop_event = None
+
+metrics = MetricsRegistry()
+m_encode = metrics.histogram('encode_ms', "JPEG 인코딩")
+m_age = metrics.histogram('frame_age_ms', "전송 시점 프레임 나이 (캡처 기준)")
+c_torn = metrics.counter('shm_torn_reads_total', "복사 중 덮어써져 버린 프레임")
+metrics.counter_func('frames_total', lambda: frame_ring.latest_seq, "카메라 프로세스가 보낸 프레임")
+metrics.counter_func('audio_bearings_total', lambda: audio_record.seq, "음향 프로세스가 보낸 방위")
+metrics.counter_func('fusion_results_total', lambda: result_record.seq, "융합 결과 수")
+
+broadcaster = FrameBroadcaster(quality=70, encode_hist=m_encode, age_hist=m_age)
+metrics.gauge('stream_subscribers', lambda: broadcaster.subscribers, "영상 시청자 수")
+metrics.counter_func('jpeg_encodes_total', lambda: broadcaster.encodes, "JPEG 인코딩 횟수")
+
+app = Flask(__name__)
+
+
+def audio_process(log_level):
+    """음향 프로세스: 최신 방위를 음향 레코드에 기록"""
+    configure_logging(log_level, background=True)
+    audio_sensor = AudioSensorWrapper(streaming=True, imu_rate=100.0)
+    print("✅ 음향 프로세스 시작")
+
+    try:
+        while not stop_event.is_set():
+            try:
+                readings = audio_sensor.get_audio_stream()
+                if readings:
+                    audio_record.write(readings[-1])   # 'time' = 분석 창 중간 시각
+            except Exception as e:
+                print(f"음향 오류: {e}")
+                time.sleep(0.1)
+    finally:
+        audio_sensor.close()
+        shutdown_logging()
+
+
+def camera_process(log_level, target_fps):
+    """카메라 프로세스: 탐지·융합·시각화 후 프레임 링/결과 레코드에 기록"""
+    configure_logging(log_level, background=True)
+    camera_sensor = CameraSensorWrapper(
+        stream_url=STREAM_URL,
+        detector=GAP_DETECTOR,
+        projection_scale=PROJECTION_SCALE,
+        threaded=True
+    )
+    fusion_stage = FusionStage(AdaptiveFusion())
+    gap_tracker = GapTracker()
+    scheduler = DetectionScheduler(target_fps=target_fps)
+    print("✅ 카메라 프로세스 시작")
+
+    audio_seq = 0
+    result_seq = 0
+    debug_info = None
+    best_id = -1
+
+    try:
+        while not stop_event.is_set():
+            frame = camera_sensor.read_frame()
+            if frame is None:
+                time.sleep(0.01)
+                continue
+            t_loop = time.perf_counter()
+
+            # 음향 레코드가 바뀌었을 때만 융합 단계에 넣음
+            if audio_record.seq != audio_seq:
+                audio_seq = audio_record.seq
+                reading = audio_record.read()
+                if reading is not None:
+                    fusion_stage.put_audio(reading)
+
+            detect_now = scheduler.should_detect(frame)
+            if detect_now:
+                t0 = time.perf_counter()
+                detected, debug_info = camera_sensor.detect_gaps(frame)
+                scheduler.record_detection((time.perf_counter() - t0) * 1000.0)
+                gaps = gap_tracker.update(detected, frame.shape[1], camera_sensor.frame_time)
+                if best_id >= 0 and not gap_tracker.is_fresh(best_id):
+                    scheduler.request()
+            else:
+                gaps = gap_tracker.predict(camera_sensor.frame_time)
+            fusion_stage.put_gaps(gaps, debug_info, camera_sensor.frame_time)
+
+            snapshot, seq, _ = fusion_stage.result.get()
+            snapshot = snapshot or {}
+            result = snapshot.get('result')
+            best_id = result['best_gap'].track_id if result else -1
+            if seq != result_seq:
+                result_seq = seq
+                write_result(snapshot, camera_sensor.frame_time)
+
+            vis_frame = visualize_fast(
+                frame,
+                snapshot.get('gaps') or [],
+                result,
+                snapshot.get('audio'),
+                snapshot.get('debug')
+            )
+
+            frame_ring.write(vis_frame, camera_sensor.frame_time)
+            with frame_cond:
+                frame_cond.notify_all()
+            if not detect_now:
+                scheduler.record_frame((time.perf_counter() - t_loop) * 1000.0)
+
+    except Exception as e:
+        print(f"\n❌ 카메라 오류: {e}")
+    finally:
+        camera_sensor.release()
+        shutdown_logging()
+
+
+def write_result(snapshot, frame_time):
+    """융합 스냅샷 → 결과 레코드 (이미지/객체 없이 숫자만)"""
+    gaps = snapshot.get('gaps') or []
+    result = snapshot.get('result')
+    audio_data = snapshot.get('audio')
+
+    values = {'time': time.monotonic(), 'frame_time': frame_time, 'n_gaps': len(gaps)}
+    if result is not None:
+        best_gap = result['best_gap']
+        values.update(best_index=result['best_index'], best_angle=best_gap.angle,
+                      best_width=best_gap.width, score=result['score'],
+                      audio_trust=float(result['mode'] == 'audio_trust'),
+                      audio_weight=result['audio_weight'])
+        for key in ('audio_age', 'gap_age', 'skew'):
+            if result[key] is not None:
+                values[key] = result[key]
+    if audio_data:
+        values.update(audio_angle=audio_data['angle'], audio_snr=audio_data['snr'])
+    result_record.write(values)
+
+
+def frame_pump():
+    """프레임 링 → 방송 허브 (웹 프로세스 스레드)
+
+    방송 허브의 빈 버퍼를 claim()해서 공유 메모리에서 바로 읽어 넣는다 (복사 1회).
+    시청자가 없으면 읽지 않고 seq만 따라간다.
+    """
+    last_seq = 0
+
+    while not stop_event.is_set():
+        with frame_cond:
+            if not frame_cond.wait_for(lambda: frame_ring.latest_seq > last_seq, 1.0):
+                continue
+
+        claimed = broadcaster.claim(frame_ring.shape)
+        if claimed is None:
+            last_seq = frame_ring.latest_seq
+            continue
+        index, out = claimed
+
+        got = frame_ring.read(out, last_seq)
+        if got is None:
+            broadcaster.release(index)
+            c_torn.inc()
+            continue
+        last_seq, frame_time = got
+        broadcaster.commit(index, frame_time)
+
+
+@app.route('/')
+def index():
+    return """
+    <html>
+    <head>
+        <title>RC Car Vision - Multiprocess</title>
+        <meta name="viewport" content="width=device-width, initial-scale=1">
+        <style>
+            body { margin: 0; padding: 10px; background: #000; color: #0f0;
+                   font-family: monospace; text-align: center; }
+            img { width: 100%; max-width: 1280px; border: 2px solid #0f0; }
+        </style>
+    </head>
+    <body>
+        <h1>🚗 RC CAR - LIVE (MP)</h1>
+        <img src="/video_feed" alt="Live">
+    </body>
+    </html>
+    """
+
+
+@app.route('/video_feed')
+def video_feed():
+    return Response(broadcaster.frames(),
+                   mimetype='multipart/x-mixed-replace; boundary=frame')
+
+
+@app.route('/status')
+def status():
+    """최신 융합 결과 레코드"""
+    return jsonify(result_record.read() or {})
+
+
+@app.route('/metrics')
+def metrics_prometheus():
+    return Response(metrics.render_prometheus(),
+                   mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/metrics.json')
+def metrics_json():
+    return jsonify(metrics.to_dict())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RC카 멀티프로세스 융합 스트리밍 서버")
+    parser.add_argument('--width', type=int, default=640, help="스트림 프레임 폭")
+    parser.add_argument('--height', type=int, default=480, help="스트림 프레임 높이")
+    parser.add_argument('--slots', type=int, default=4, help="공유 프레임 링 슬롯 수")
+    parser.add_argument('--target-fps', type=float, default=TARGET_FPS,
+                        help="카메라 프로세스 목표 FPS (탐지 주기 자동 조절)")
+    parser.add_argument('--log-level', default='INFO', help="fusion 로그 레벨")
+    args = parser.parse_args()
+
+    configure_logging(args.log_level, background=True)
+
+    # 공유 객체는 fork 전에 만들어 자식에게 그대로 물려줌 (Linux 전용)
+    ctx = mp.get_context('fork')
+    frame_ring = SharedFrameRing((args.height, args.width, 3), slots=args.slots)
+    frame_cond = ctx.Condition()
+    audio_record = SharedRecord(AUDIO_FIELDS)
+    result_record = SharedRecord(RESULT_FIELDS)
+    stop_event = ctx.Event()
+
+    workers = [
+        ctx.Process(target=audio_process, args=(args.log_level,),
+                    name='audio', daemon=True),
+        ctx.Process(target=camera_process, args=(args.log_level, args.target_fps),
+                    name='camera', daemon=True),
+    ]
+    for p in workers:
+        p.start()
+
+    pump_thread = threading.Thread(target=frame_pump, daemon=True)
+    pump_thread.start()
+
+    print("\n" + "=" * 60)
+    print("🌐 멀티프로세스 웹 스트리밍 서버!")
+    print("=" * 60)
+    print("\n📺 http://172.20.10.6:5000")
+    print(f"\n🚀 프로세스: 음향(pid {workers[0].pid}) | 카메라(pid {workers[1].pid}) | 웹(pid {os.getpid()})")
+    print(f"   • 공유 메모리 프레임 링 {args.slots}슬롯 ({args.width}x{args.height})")
+    print("\n종료: Ctrl+C\n")
+
+    try:
+        app.run(host='0.0.0.0', port=5000, threaded=True, debug=False)
+    finally:
+        stop_event.set()
+        for p in workers:
+            p.join(timeout=2.0)
+            if p.is_alive():
+                p.terminate()
+        pump_thread.join(timeout=2.0)
+
+        frame_ring.close(unlink=True)
+        audio_record.close(unlink=True)
+        result_record.close(unlink=True)
+        shutdown_logging()
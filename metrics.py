@@ -0,0 +1,158 @@
+# fusion/metrics.py
+
+import time
+from bisect import bisect_left
+
+# 지연 히스토그램 기본 버킷 상한 (ms)
+DEFAULT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Counter:
+    """카운터 (락 없음, 스레드 하나가 증가시키는 용도)"""
+
+    __slots__ = ('name', 'help', 'value')
+
+    def __init__(self, name, help=''):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+
+class Gauge:
+    """조회 시점에 함수를 호출해 값을 읽는 게이지"""
+
+    __slots__ = ('name', 'help', 'fn')
+
+    def __init__(self, name, fn, help=''):
+        self.name = name
+        self.help = help
+        self.fn = fn
+
+    @property
+    def value(self):
+        return self.fn()
+
+
+class CounterFunc(Gauge):
+    """조회 시점에 함수를 호출해 값을 읽는 카운터 (다른 객체가 세는 누적값용)
+
+    값은 Gauge와 같이 읽지만 Prometheus에는 counter로 내보내 rate()/increase()를 쓸 수 있다.
+    """
+
+    __slots__ = ()
+
+
+class LatencyHistogram:
+    """고정 버킷 지연 히스토그램 (ms)
+
+    관측은 버킷 탐색 + 리스트 원소 증가뿐이라 락을 쓰지 않는다.
+    스레드 하나가 기록하는 것이 전제이며, 여러 스레드가 기록하면 드물게 누락될 수 있다.
+    """
+
+    __slots__ = ('name', 'help', 'buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, name, help='', buckets=DEFAULT_BUCKETS_MS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # 마지막 = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, ms):
+        self.counts[bisect_left(self.buckets, ms)] += 1
+        self.sum += ms
+        self.count += 1
+
+    def observe_since(self, t0):
+        """perf_counter() 시작 시각 t0부터 지금까지"""
+        self.observe((time.perf_counter() - t0) * 1000.0)
+
+    def percentile(self, q):
+        """버킷 상한 기준 근사 백분위수 (q: 0~1)"""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        total = 0
+        for i, c in enumerate(self.counts):
+            total += c
+            if total >= target:
+                return self.buckets[i] if i < len(self.buckets) else float('inf')
+        return float('inf')
+
+    def snapshot(self):
+        def finite(v):
+            # 마지막 버킷을 넘으면 JSON에서 null
+            return None if v == float('inf') else v
+
+        return {
+            'count': self.count,
+            'sum_ms': self.sum,
+            'mean_ms': self.sum / self.count if self.count else 0.0,
+            'p50_ms': finite(self.percentile(0.50)),
+            'p90_ms': finite(self.percentile(0.90)),
+            'p99_ms': finite(self.percentile(0.99)),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts))
+        }
+
+
+class MetricsRegistry:
+    """카운터/게이지/히스토그램 모음 + Prometheus 텍스트/JSON 출력"""
+
+    def __init__(self, prefix='fusion_'):
+        self.prefix = prefix
+        self._metrics = {}
+
+    def counter(self, name, help=''):
+        return self._register(Counter(self.prefix + name, help))
+
+    def gauge(self, name, fn, help=''):
+        return self._register(Gauge(self.prefix + name, fn, help))
+
+    def counter_func(self, name, fn, help=''):
+        return self._register(CounterFunc(self.prefix + name, fn, help))
+
+    def histogram(self, name, help='', buckets=DEFAULT_BUCKETS_MS):
+        return self._register(LatencyHistogram(self.prefix + name, help, buckets))
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render_prometheus(self):
+        lines = []
+        for name, m in self._metrics.items():
+            if m.help:
+                lines.append(f"# HELP {name} {m.help}")
+
+            if isinstance(m, LatencyHistogram):
+                lines.append(f"# TYPE {name} histogram")
+                counts = list(m.counts)
+                cumulative = 0
+                for bound, c in zip(m.buckets, counts):
+                    cumulative += c
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+                cumulative += counts[-1]
+                lines.append(f'{name}_bucket{{le="+Inf"}} {cumulative}')
+                lines.append(f"{name}_sum {m.sum}")
+                lines.append(f"{name}_count {cumulative}")
+            else:
+                kind = 'counter' if isinstance(m, (Counter, CounterFunc)) else 'gauge'
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {m.value}")
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self):
+        out = {}
+        for name, m in self._metrics.items():
+            if isinstance(m, LatencyHistogram):
+                out[name] = m.snapshot()
+            else:
+                out[name] = m.value
+        return out
@@ -0,0 +1,118 @@
+# fusion/noise_floor.py
+
+import numpy as np
+
+
+def frame_rms(frames):
+    """(k, N, C) 또는 (N, C) 블록 → 채널별 RMS (k, C) 또는 (C,)"""
+    x = np.asarray(frames, dtype=np.float64)
+    return np.sqrt(np.einsum('...nc,...nc->...c', x, x) / x.shape[-2])
+
+
+class NoiseFloor:
+    """채널별 배경 소음 RMS 추정 + 저비용 활성 판정
+
+    바닥은 보정된 기본값(initial, 예전 고정 noise_level)에서 시작하고 두 가지로 갱신한다:
+    - 활성 판정을 받지 않은 프레임: 바닥보다 조용하면 빠르게 내려가고
+      (지수이동평균, fall 계수), 바닥 ~ 바닥+gate_db 사이면 초당 rise_db만큼 올라감
+    - 모든 프레임: window_seconds 구간의 최소 RMS (minimum statistics).
+      구간 전체에 바닥보다 조용한 프레임이 하나도 없으면(더 시끄러운 장소)
+      바닥을 그 최솟값까지 올린다.
+
+    목표 소리가 잠깐이라도 쉬면 그 사이 프레임이 구간 최솟값이 되므로 바닥이
+    끌려 올라가지 않는다. window_seconds보다 오래 한 번도 쉬지 않는 소리는
+    배경 소음과 구분할 수 없어 배경으로 흡수된다.
+
+    SNR은 바닥 대비 dB이고, gate_db 이상인 프레임만 활성으로 본다.
+    활성이 아닌 프레임은 GCC-PHAT와 IMU 읽기를 건너뛴다.
+    """
+
+    def __init__(self, channels=2, gate_db=6.0, initial=1000000.0, fall=0.3,
+                 rise_db=3.0, window_seconds=20.0, sub_windows=10,
+                 min_floor=1.0, max_snr_db=40.0):
+        self.channels = channels
+        self.gate_db = gate_db
+        self.initial = initial            # 시작 바닥 (마이크 이득 기준 보정값)
+        self.fall = fall
+        self.rise_db = rise_db            # 비활성 프레임의 바닥 상승 속도 (dB/초)
+        self.window_seconds = window_seconds
+        self.sub_windows = sub_windows    # 구간 최솟값을 나눠 보관하는 칸 수
+        self.min_floor = min_floor        # log(0) 방지
+        self.max_snr_db = max_snr_db
+
+        self.floor = None
+        self.frames = 0
+        self.gated = 0                    # 활성 아님으로 건너뛴 프레임 수
+        self.reset()
+
+    def reset(self):
+        self.floor = np.full(self.channels, max(self.initial, self.min_floor))
+        self.frames = 0
+        self.gated = 0
+        self._mins = np.full((self.sub_windows, self.channels), np.inf)
+        self._sub = 0                     # 현재 채우는 칸
+        self._sub_elapsed = 0.0
+        self._filled = 0                  # 다 채운 칸 수 (sub_windows면 구간 전체가 찬 것)
+
+    @property
+    def level(self):
+        """채널 평균 소음 RMS"""
+        return float(self.floor.mean())
+
+    def snr_db(self, rms):
+        """채널별 RMS (..., C) → SNR(dB), 0~max_snr_db로 자름"""
+        rms = np.asarray(rms, dtype=np.float64)
+        ratio = rms.mean(axis=-1) / self.floor.mean()
+        snr = 20 * np.log10(np.maximum(ratio, 1e-12))
+        return np.clip(snr, 0.0, self.max_snr_db)
+
+    def update(self, rms, seconds):
+        """프레임 묶음의 채널별 RMS (k, C)로 SNR과 활성 여부를 구하고 바닥 갱신
+
+        seconds: 직전 갱신 이후 실제로 지난 시간
+        반환: (snr_db (k,), active (k,) bool)
+        """
+        rms = np.atleast_2d(np.asarray(rms, dtype=np.float64))
+        if len(rms) == 0:
+            return np.empty(0), np.zeros(0, dtype=bool)
+
+        # 판정은 갱신 전 바닥 기준
+        snr = self.snr_db(rms)
+        active = snr >= self.gate_db
+        floor = self.floor
+
+        if not active.all():
+            quietest = rms[~active].min(axis=0)
+            down = quietest < floor
+            floor[down] += self.fall * (quietest[down] - floor[down])
+            limit = floor * 10 ** (self.rise_db * seconds / 20)
+            floor[~down] = np.minimum(quietest[~down], limit[~down])
+
+        # 구간 최솟값: 구간 내내 바닥보다 시끄러웠으면 바닥을 올림
+        window_min = self._track_minimum(rms.min(axis=0), seconds)
+        if window_min is not None:
+            np.maximum(floor, window_min, out=floor)
+        np.maximum(floor, self.min_floor, out=floor)
+
+        self.frames += len(rms)
+        self.gated += int(len(rms) - active.sum())
+        return snr, active
+
+    def _track_minimum(self, quietest, seconds):
+        """최근 window_seconds 동안의 채널별 최소 RMS (구간이 아직 덜 찼으면 None)"""
+        np.minimum(self._mins[self._sub], quietest, out=self._mins[self._sub])
+        self._sub_elapsed += seconds
+
+        sub_seconds = self.window_seconds / self.sub_windows
+        steps = min(int(self._sub_elapsed // sub_seconds), self.sub_windows)
+        for _ in range(steps):
+            # 가장 오래된 칸을 비우고 새 칸으로
+            self._sub = (self._sub + 1) % self.sub_windows
+            self._mins[self._sub] = np.inf
+            self._filled = min(self._filled + 1, self.sub_windows)
+        if steps:
+            self._sub_elapsed %= sub_seconds
+
+        if self._filled < self.sub_windows:
+            return None
+        return self._mins.min(axis=0)
@@ -0,0 +1,141 @@
+# fusion/pipeline.py
+
+import time
+import logging
+import threading
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+
+class LatestValue:
+    """최신 값 하나만 보관하는 채널 (크기 1)
+
+    쓰는 쪽은 막히지 않고 덮어쓰며, 읽는 쪽은 seq로 새 값 여부를 판단한다.
+    (value, seq, timestamp) 튜플을 통째로 교체하므로 value/get()은 락이 필요 없다.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = (None, 0, 0.0)
+        self._read_seq = 0
+        self.overwritten = 0   # 읽히기 전에 덮어쓴 값 수
+
+    def put(self, value, timestamp=None):
+        with self._cond:
+            seq = self._item[1]
+            if seq > self._read_seq:
+                self.overwritten += 1
+            self._item = (value, seq + 1,
+                          timestamp if timestamp is not None else time.monotonic())
+            self._cond.notify_all()
+
+    @property
+    def value(self):
+        return self._item[0]
+
+    @property
+    def seq(self):
+        return self._item[1]
+
+    def get(self):
+        """(value, seq, timestamp)"""
+        item = self._item
+        self._read_seq = item[1]
+        return item
+
+    def wait_newer(self, seq, timeout=None):
+        """seq보다 새 값이 올 때까지 대기 후 get() (시간 초과 시 None)"""
+        with self._cond:
+            ready = self._cond.wait_for(lambda: self._item[1] > seq, timeout)
+        return self.get() if ready else None
+
+
+class FusionStage:
+    """음향/틈 입력 중 하나가 바뀔 때마다 융합해서 결과 채널에 게시
+
+    새 입력을 넣은 스레드에서 바로 융합하므로 스레드 전환 지연이 없고,
+    결과 스냅샷에는 융합에 쓴 음향·틈·디버그 정보가 함께 담겨 서로 어긋나지 않는다.
+
+    음향은 최근 audio_history개를 보관해 두고, 틈 프레임 시각에 가장 가까운
+    방위를 골라 융합한다 (시각 정렬).
+    """
+
+    def __init__(self, fusion, fuse_hist=None, skew_hist=None, audio_history=16,
+                 distance_source=None):
+        self.fusion = fusion
+        self.distance_source = distance_source   # latest()를 가진 거리 링 (선택)
+        self.fuse_hist = fuse_hist
+        self.skew_hist = skew_hist   # 융합에 쓴 음향-틈 시각 차 |skew| (ms)
+        self._audio_history = deque(maxlen=audio_history)
+
+        self.audio = LatestValue()
+        self.gaps = LatestValue()
+        self.result = LatestValue()
+
+        self._lock = threading.Lock()
+
+    def put_audio(self, audio_data, timestamp=None):
+        if timestamp is None and audio_data:
+            timestamp = audio_data.get('time')
+        with self._lock:
+            if audio_data:
+                self._audio_history.append(audio_data)
+        self.audio.put(audio_data, timestamp)
+        self._run()
+
+    def put_audio_readings(self, readings):
+        """hop 묶음의 방위들을 한 번에 (이력에는 모두 넣고 융합은 최신 기준 1회)"""
+        if not readings:
+            return
+        with self._lock:
+            self._audio_history.extend(readings[:-1])
+        self.put_audio(readings[-1])
+
+    def _aligned_audio(self, gaps):
+        """틈 프레임 시각에 가장 가까운 음향 (시각을 모르면 최신 값)"""
+        gap_time = getattr(gaps, 'timestamp', None)
+        if gap_time is None or not self._audio_history:
+            return self.audio.value
+
+        best, best_dt = None, None
+        for audio_data in reversed(self._audio_history):   # 동률이면 최신 우선
+            audio_time = audio_data.get('time')
+            if audio_time is None:
+                continue
+            dt = abs(audio_time - gap_time)
+            if best_dt is None or dt < best_dt:
+                best, best_dt = audio_data, dt
+        return best if best is not None else self.audio.value
+
+    def put_gaps(self, gaps, debug_info=None, timestamp=None):
+        self.gaps.put((gaps, debug_info), timestamp)
+        self._run()
+
+    def _run(self):
+        with self._lock:
+            gaps, debug_info = self.gaps.value or (None, None)
+            audio_data = self._aligned_audio(gaps) if gaps else self.audio.value
+
+            result = None
+            if gaps:   # 음향이 없으면 융합기가 visual_only로 처리
+                t0 = time.perf_counter()
+                try:
+                    # 거리 링이 있으면 아직 측정이 없어도 {} (융합기가 감속 처리)
+                    distance = (self.distance_source.latest() or {}
+                                if self.distance_source is not None else None)
+                    result = self.fusion.fuse(audio_data, gaps, with_scores=False,
+                                              distance=distance)
+                except Exception:
+                    log.exception("융합 오류")
+                if self.fuse_hist is not None:
+                    self.fuse_hist.observe_since(t0)
+                if self.skew_hist is not None and result and result['skew'] is not None:
+                    self.skew_hist.observe(abs(result['skew']) * 1000.0)
+
+            self.result.put({
+                'audio': audio_data,
+                'gaps': gaps,
+                'debug': debug_info,
+                'result': result
+            })
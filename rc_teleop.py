@@ -1,40 +1,155 @@
 """
 RC카 키보드 원격 조종 프로그램
 작성자: 예성
+
+터미널은 시작할 때 한 번만 raw 모드로 바꾸고, 키 입력과 시리얼 수신을
+asyncio 이벤트 루프 하나에서 함께 처리한다 (키마다 termios 전환 없음).
+키를 누르고 있으면(자동 반복) 계속 주행하고, RELEASE_TIMEOUT 동안
+입력이 없으면 손을 뗀 것으로 보고 정지한다.
 """
 
-import serial
-import time
 import sys
-import tty
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+import asyncio
+import argparse
 import termios
+import tty
+import serial
 
-# 시리얼 포트 설정
-SERIAL_PORT = '/dev/ttyUSB0'  # 또는 /dev/ttyUSB0
-BAUD_RATE = 9600
+from fusion.serial_link import MotorLink, FRAME_TELEMETRY
+from fusion.telemetry import DistanceRing
+
+# 시리얼 포트 설정 (arduino_rc_ultra.ino의 BAUD_RATE와 같아야 함)
+SERIAL_PORT = '/dev/ttyUSB0'
+BAUD_RATE = 115200
+
+# 키를 뗀 것으로 보는 입력 공백 (키보드 자동 반복 시작 지연보다 길게)
+RELEASE_TIMEOUT = 0.6
+
+# 주행 중 같은 명령 재전송 주기 (아두이노 명령 워치독 300ms보다 짧게)
+KEEPALIVE_INTERVAL = 0.1
+
+KEY_COMMANDS = {
+    'w': 'F',
+    's': 'B',
+    'a': 'L',
+    'd': 'R'
+}
+
+COMMAND_NAMES = {
+    'F': '⬆️ 전진',
+    'B': '⬇️ 후진',
+    'L': '⬅️ 좌회전',
+    'R': '➡️ 우회전',
+    'S': '⏹️ 정지'
+}
+
+
+def out(text):
+    """raw 모드 출력 (줄바꿈은 \\r\\n)"""
+    sys.stdout.write(text.replace('\n', '\r\n'))
+    sys.stdout.flush()
+
+
+class Teleop:
+    """키 입력 → 주행 상태 → 모터 링크"""
+
+    def __init__(self, link, distance_ring, release_timeout=RELEASE_TIMEOUT, speed=200):
+        self.link = link
+        self.distance_ring = distance_ring
+        self.release_timeout = release_timeout
+        self.speed = speed
+
+        self.command = 'S'
+        self.last_key_time = 0.0
+        self.last_send_time = 0.0
+        self.keys = 0
+        self.done = asyncio.Event()
+
+    def on_stdin(self):
+        """stdin 읽기 가능 (이벤트 루프 콜백) - 쌓인 키를 한 번에 처리"""
+        data = os.read(sys.stdin.fileno(), 64).decode('utf-8', errors='ignore')
+        for ch in data.lower():
+            self.on_key(ch)
+
+    def on_key(self, ch):
+        now = time.monotonic()
+
+        if ch in ('q', '\x03'):   # q 또는 Ctrl+C
+            self.set_command('S')
+            self.done.set()
+        elif ch in ('x', ' '):
+            self.set_command('S')
+        elif ch in ('+', '='):
+            self.speed = min(self.speed + 20, 255)
+            self.resend()
+        elif ch == '-':
+            self.speed = max(self.speed - 20, 60)
+            self.resend()
+        elif ch in KEY_COMMANDS:
+            # 자동 반복은 같은 명령이므로 시각만 갱신 (전송 안 함)
+            # 단, 아두이노가 아직 그 명령을 적용하지 않았으면 (ACK 실패 등) 다시 전송
+            command = KEY_COMMANDS[ch]
+            self.keys += 1
+            self.last_key_time = now
+            if command == self.command and self.link.last_applied != command:
+                self.send()
+            else:
+                self.set_command(command)
+
+    def set_command(self, command):
+        if command != self.command:
+            self.command = command
+            self.send()
+
+    def resend(self):
+        if self.command != 'S':
+            self.send()
+
+    def send(self):
+        self.last_send_time = time.monotonic()
+        self.link.send(self.command, 0 if self.command == 'S' else self.speed)
+
+    async def watch_release(self):
+        """키를 뗀 뒤 RELEASE_TIMEOUT이 지나면 정지, 주행 중에는 명령 유지 재전송"""
+        while not self.done.is_set():
+            now = time.monotonic()
+            if self.command != 'S':
+                if now - self.last_key_time > self.release_timeout:
+                    self.set_command('S')
+                elif now - self.last_send_time >= KEEPALIVE_INTERVAL:
+                    self.resend()   # 아두이노 워치독이 정지시키지 않도록
+            await asyncio.sleep(0.02)
+
+    async def show_status(self):
+        """상태 줄 (명령, PWM, 키→ACK 지연, 거리)"""
+        while not self.done.is_set():
+            link = self.link
+            latency = (f"{link.command_latency * 1000:5.1f}ms"
+                       if link.command_latency is not None else "  -  ")
+            write = (f"{link.write_delay * 1000:4.2f}ms"
+                     if link.write_delay is not None else " - ")
+            reading = self.distance_ring.latest()
+            distance = f"{reading['distance']:4.0f}cm" if reading else "  -  "
+            applied = link.last_applied or '-'
+
+            out(f"\r\x1b[K{COMMAND_NAMES[self.command]} | PWM {self.speed:3d}"
+                f" | 키→전송 {write} | 키→ACK {latency}"
+                f" | 적용 {applied} | 거리 {distance} | 재전송 {link.retries}")
+            await asyncio.sleep(0.1)
+
+
+async def run(args):
+    link = MotorLink(args.port, args.baud)
+    distance_ring = DistanceRing()
+    link.on_frame(FRAME_TELEMETRY, distance_ring.on_frame)
 
-# 키 입력 함수 (non-blocking)
-def get_key():
-    """키보드 입력 받기 (한 글자씩)"""
-    fd = sys.stdin.fileno()
-    old_settings = termios.tcgetattr(fd)
     try:
-        tty.setraw(sys.stdin.fileno())
-        ch = sys.stdin.read(1)
-    finally:
-        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-    return ch
-
-def main():
-    print("=" * 50)
-    print("RC카 원격 조종 프로그램")
-    print("=" * 50)
-
-    # 시리얼 포트 연결
-    try:
-        ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
-        time.sleep(2)  # 아두이노 리셋 대기
-        print(f"시리얼 연결 성공: {SERIAL_PORT}")
+        await link.open()
+        print(f"시리얼 연결 성공: {args.port} @ {args.baud}")
     except serial.SerialException as e:
         print(f" 시리얼 연결 실패: {e}")
         print("확인 사항:")
@@ -43,66 +158,55 @@ def main():
         print("   3. 권한 문제: sudo usermod -a -G dialout $USER")
         sys.exit(1)
 
-    # 초기 메시지 읽기
-    time.sleep(1)
-    while ser.in_waiting:
-        line = ser.readline().decode('utf-8', errors='ignore').strip()
-        print(f"Arduino: {line}")
-
     print("\n" + "=" * 50)
     print("조작법:")
     print("  W : 전진")
     print("  S : 후진")
     print("  A : 좌회전")
     print("  D : 우회전")
-    print("  X : 정지")
+    print("  X / Space : 정지")
+    print("  + / - : 속도 조절")
     print("  Q : 프로그램 종료")
+    print(f"  (키를 누르고 있는 동안 주행, 떼면 {args.release:.1f}초 뒤 정지)")
     print("=" * 50)
     print("\n키를 눌러 조종하세요...\n")
 
-    current_command = 'x'  # 현재 명령
+    teleop = Teleop(link, distance_ring, release_timeout=args.release, speed=args.speed)
+    loop = asyncio.get_running_loop()
 
+    fd = sys.stdin.fileno()
+    old_settings = termios.tcgetattr(fd)
+    tty.setraw(fd)   # 한 번만 raw 모드로
     try:
-        while True:
-            # 키 입력 받기
-            key = get_key().lower()
-
-            # 명령 처리
-            if key == 'q':
-                print("\n프로그램 종료...")
-                ser.write(b'x')  # 정지 명령
-                break
-
-            elif key in ['w', 's', 'a', 'd', 'x']:
-                # 명령 전송
-                ser.write(key.encode())
-                current_command = key
-
-                # 명령 표시
-                cmd_name = {
-                    'w': '⬆️ 전진',
-                    's': '⬇️ 후진',
-                    'a': '⬅️ 좌회전',
-                    'd': '우회전',
-                    'x': '⏹️정지'
-                }
-                print(f"명령: {cmd_name[key]}")
-
-            # 아두이노 응답 읽기
-            while ser.in_waiting:
-                line = ser.readline().decode('utf-8', errors='ignore').strip()
-                if line:
-                    print(f"  └─ {line}")
-
-            time.sleep(0.05)  # 50ms 대기
-
-    except KeyboardInterrupt:
-        print("\n\n프로그램 중단 (Ctrl+C)")
-        ser.write(b'x')  # 정지 명령
-
+        loop.add_reader(fd, teleop.on_stdin)
+        tasks = [asyncio.create_task(teleop.watch_release()),
+                 asyncio.create_task(teleop.show_status())]
+        await teleop.done.wait()
+        for task in tasks:
+            task.cancel()
     finally:
-        ser.close()
+        loop.remove_reader(fd)
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+        print("\n\n프로그램 종료...")
+        await link.close()   # 정지 명령 후 포트 닫기
         print("시리얼 포트 닫힘")
 
+
+def main():
+    parser = argparse.ArgumentParser(description="RC카 키보드 원격 조종")
+    parser.add_argument('--port', default=SERIAL_PORT, help="아두이노 시리얼 포트")
+    parser.add_argument('--baud', type=int, default=BAUD_RATE, help="통신 속도")
+    parser.add_argument('--speed', type=int, default=200, help="주행 PWM (0~255)")
+    parser.add_argument('--release', type=float, default=RELEASE_TIMEOUT,
+                        help="키를 뗀 것으로 보는 입력 공백 (초)")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("RC카 원격 조종 프로그램")
+    print("=" * 50)
+
+    asyncio.run(run(args))
+
+
 if __name__ == "__main__":
     main()
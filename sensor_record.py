@@ -0,0 +1,289 @@
+# fusion/sensor_record.py
+#
+# 센서 기록/재생
+#
+# 세션 폴더 구성:
+#   session.json        스트림별 청크 목록 (파일명, 레코드 shape, dtype) + 속성
+#   <stream>_NNN.bin    고정 크기 레코드를 이어 붙인 원시 데이터
+#   <stream>_NNN.ts     레코드별 타임스탬프 (float64, monotonic 초)
+#
+# 레코드 수는 파일 크기로 계산하므로 기록이 중간에 끊겨도 재생할 수 있다.
+# 재생은 np.memmap 뷰를 그대로 넘기므로 복사가 없다.
+
+import os
+import json
+import queue
+import threading
+import time
+import numpy as np
+
+
+class SessionRecorder:
+    """타임스탬프가 붙은 센서 레코드를 청크 파일에 기록
+
+    record()는 큐에 넣기만 하고 실제 파일 쓰기는 백그라운드 스레드가 한다
+    (오디오 콜백/카메라 루프에서 디스크 I/O를 하지 않음)
+    """
+
+    def __init__(self, path, chunk_records=1000, max_pending=256):
+        self.path = path
+        self.chunk_records = chunk_records
+        os.makedirs(path, exist_ok=True)
+
+        self.attrs = {}
+        self.dropped = 0
+
+        self._chunks = {}    # 스트림 이름 → 청크 메타 리스트
+        self._writers = {}   # 스트림 이름 → 현재 청크 상태
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def record(self, name, array, timestamp=None, copy=True):
+        """레코드 하나 추가 (큐가 가득 차면 버림)"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if copy:
+            array = np.array(array, copy=True)
+
+        try:
+            self._queue.put_nowait((name, array, timestamp))
+        except queue.Full:
+            self.dropped += 1
+
+    def record_audio(self, block, timestamp=None):
+        self.record('audio', block, timestamp)
+
+    def record_frame(self, frame, timestamp=None):
+        # 캡처된 프레임은 재사용되지 않으므로 복사 생략
+        self.record('camera', frame, timestamp, copy=False)
+
+    def record_yaw(self, yaw, timestamp=None):
+        self.record('imu', np.array([yaw], dtype=np.float64), timestamp, copy=False)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            self._write(*item)
+
+        for writer in self._writers.values():
+            writer['data'].close()
+            writer['ts'].close()
+        self._writers.clear()
+        self._save_meta()
+
+    def _write(self, name, array, timestamp):
+        array = np.ascontiguousarray(array)
+        writer = self._writers.get(name)
+
+        if (writer is None or writer['count'] >= self.chunk_records or
+                writer['shape'] != array.shape or writer['dtype'] != array.dtype.str):
+            writer = self._open_chunk(name, array)
+
+        writer['data'].write(array.data)
+        writer['ts'].write(np.float64(timestamp).tobytes())
+        writer['count'] += 1
+
+    def _open_chunk(self, name, array):
+        old = self._writers.get(name)
+        if old is not None:
+            old['data'].close()
+            old['ts'].close()
+
+        chunks = self._chunks.setdefault(name, [])
+        stem = f"{name}_{len(chunks):03d}"
+        chunks.append({
+            'file': stem + '.bin',
+            'ts': stem + '.ts',
+            'shape': list(array.shape),
+            'dtype': array.dtype.str
+        })
+        self._save_meta()
+
+        writer = {
+            'data': open(os.path.join(self.path, stem + '.bin'), 'wb'),
+            'ts': open(os.path.join(self.path, stem + '.ts'), 'wb'),
+            'shape': array.shape,
+            'dtype': array.dtype.str,
+            'count': 0
+        }
+        self._writers[name] = writer
+        return writer
+
+    def _save_meta(self):
+        meta = {'version': 1, 'attrs': self.attrs, 'streams': self._chunks}
+        tmp = os.path.join(self.path, 'session.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, 'session.json'))
+
+
+class SessionReader:
+    """기록된 세션을 memmap으로 열기"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'session.json')) as f:
+            meta = json.load(f)
+
+        self.attrs = meta.get('attrs', {})
+        self.streams = {}
+        for name, chunks in meta['streams'].items():
+            self.streams[name] = [c for c in (self._open_chunk(m) for m in chunks)
+                                  if c is not None]
+
+    def _open_chunk(self, meta):
+        shape = tuple(meta['shape'])
+        dtype = np.dtype(meta['dtype'])
+        record_bytes = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+
+        data_path = os.path.join(self.path, meta['file'])
+        ts_path = os.path.join(self.path, meta['ts'])
+        count = min(os.path.getsize(data_path) // record_bytes,
+                    os.path.getsize(ts_path) // 8)
+        if count == 0:
+            return None
+
+        data = np.memmap(data_path, dtype=dtype, mode='r', shape=(count,) + shape)
+        timestamps = np.memmap(ts_path, dtype=np.float64, mode='r', shape=(count,))
+        return timestamps, data
+
+    def timestamps(self, name):
+        chunks = self.streams.get(name, [])
+        if not chunks:
+            return np.empty(0)
+        return np.concatenate([ts for ts, _ in chunks])
+
+    def records(self, name):
+        """(timestamp, 레코드 뷰) 순회"""
+        for timestamps, data in self.streams.get(name, []):
+            for i in range(len(timestamps)):
+                yield float(timestamps[i]), data[i]
+
+    def start_time(self):
+        starts = [chunks[0][0][0] for chunks in self.streams.values() if chunks]
+        return float(min(starts)) if starts else 0.0
+
+
+class ReplayClock:
+    """재생 시각 관리 (실시간 또는 최대 속도)
+
+    여러 재생 소스가 같은 시계를 공유해서 기록 당시의 시간 관계를 유지한다
+    """
+
+    def __init__(self, start_time, realtime=True, speed=1.0):
+        self.start_time = start_time
+        self.realtime = realtime
+        self.speed = speed
+        self._wall_start = None
+        self._current = start_time
+        self._lock = threading.Lock()   # 재생 스레드들이 동시에 시작해도 기준 시각은 하나
+
+    def wait_until(self, timestamp):
+        """기록 시각 timestamp가 될 때까지 대기"""
+        if self.realtime:
+            if self._wall_start is None:
+                with self._lock:
+                    if self._wall_start is None:
+                        self._wall_start = time.monotonic()
+            target = self._wall_start + (timestamp - self.start_time) / self.speed
+            delay = target - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        with self._lock:
+            self._current = max(self._current, timestamp)
+
+    def now(self):
+        """현재 재생 중인 기록 시각"""
+        if self.realtime and self._wall_start is not None:
+            return self.start_time + (time.monotonic() - self._wall_start) * self.speed
+        return self._current
+
+
+class ReplayCapture:
+    """cv2.VideoCapture 대체 (기록된 카메라 프레임 재생)"""
+
+    def __init__(self, reader, clock, stream='camera'):
+        self._records = reader.records(stream)
+        self.clock = clock
+        self._opened = True
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self):
+        item = next(self._records, None)
+        if item is None:
+            self._opened = False
+            return False, None
+
+        timestamp, frame = item
+        self.clock.wait_until(timestamp)
+        return True, frame
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self._opened = False
+
+
+class ReplayAudioSource:
+    """sd.InputStream 대체 (기록된 오디오 블록을 콜백으로 재생)"""
+
+    def __init__(self, reader, clock, stream='audio'):
+        self.reader = reader
+        self.clock = clock
+        self.stream = stream
+        self.callback = None
+        self.finished = False
+
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+
+    def _run(self):
+        for timestamp, block in self.reader.records(self.stream):
+            if not self._running:
+                return
+            self.clock.wait_until(timestamp)
+            self.callback(block, len(block), None, None)
+        self.finished = True
+
+
+class ReplayTracker:
+    """SoundTracker 대체 (재생 시각에 해당하는 기록 yaw)"""
+
+    def __init__(self, reader, clock, stream='imu'):
+        self.clock = clock
+        self._times = reader.timestamps(stream)
+        chunks = reader.streams.get(stream, [])
+        self._yaws = (np.concatenate([data[:, 0] for _, data in chunks])
+                      if chunks else np.zeros(0))
+        self.current_yaw = 0.0
+
+    def update_yaw_combined(self):
+        if len(self._times) == 0:
+            return self.current_yaw
+        i = int(np.searchsorted(self._times, self.clock.now(), side='right')) - 1
+        self.current_yaw = float(self._yaws[max(i, 0)])
+        return self.current_yaw
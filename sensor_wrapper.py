@@ -2,6 +2,8 @@
 
 import sys
 import os
+import time
+import logging
 import cv2
 import numpy as np
 import sounddevice as sd
@@ -12,113 +14,405 @@ sys.path.append(os.path.join(project_root, 'existing'))
 import direction_finder as df
 from imu_tracker import SoundTracker
 
+from .audio_stream import AudioRingBuffer
+from .audio_doa import GccPhatEngine
+from .imu_sampler import YawSampler
+from .noise_floor import NoiseFloor, frame_rms
+from .gap import GapBatch
+from .frame_grabber import FrameGrabber
+
+log = logging.getLogger(__name__)
+
 
 class AudioSensorWrapper:
-    def __init__(self):
+    def __init__(self, streaming=False, buffer_seconds=2.0, hop_size=None,
+                 source=None, tracker=None, recorder=None, imu_rate=None,
+                 gate_db=6.0):
         self.fs = df.FS
         self.device = 1
-        self.tracker = SoundTracker(address=0x69)
+        self.tracker = tracker if tracker is not None else SoundTracker(address=0x69)
+
+        # source: sd.InputStream 대신 쓸 스트림 (재생용), recorder: 세션 기록기
+        self.source = source
+        self.recorder = recorder
+        self.process_hist = None   # hop 묶음 처리 지연 히스토그램 (선택)
+
+        # IMU 백그라운드 샘플링 (imu_rate=None이면 방위마다 동기 읽기)
+        # 스트리밍 서버처럼 방위를 계속 내는 쪽만 켠다 (일회성 측정에 스레드 불필요)
+        self.imu = None
+        if imu_rate:
+            self.imu = YawSampler(self.tracker, rate_hz=imu_rate, recorder=recorder)
+            self.imu.start()
+
+        # 스트리밍 모드: 장치를 한 번만 열고 콜백으로 링 버퍼에 계속 기록
+        self.streaming = streaming
+        self.stream = None
+        self.ring = None
+        self._read_pos = 0
+        self._block_time = 0.0     # 마지막으로 읽은 블록의 중간 시각 (monotonic)
+        self._window = np.empty((df.SAMPLES_PER_FRAME, 2), dtype=np.int32)
+
+        # 겹치는 hop 단위 방위 추정 엔진 (기본 50% 오버랩)
+        self.doa = GccPhatEngine(self.fs, df.SAMPLES_PER_FRAME,
+                                 hop_size or df.SAMPLES_PER_FRAME // 2,
+                                 df.MAX_DELAY_SAMPLES)
+
+        # 적응형 소음 바닥: SNR 기준 + 활성 판정 (비활성 프레임은 GCC-PHAT/IMU 생략)
+        self.noise = NoiseFloor(channels=2, gate_db=gate_db)
+        self._last_noise_time = None
+
+        if streaming:
+            self.start_stream(buffer_seconds)
         print("✅ 음향 센서 초기화")
 
+    def start_stream(self, buffer_seconds=2.0):
+        """상시 캡처 스트림 시작"""
+        capacity = max(int(self.fs * buffer_seconds), df.SAMPLES_PER_FRAME * 4)
+        self.ring = AudioRingBuffer(capacity, channels=2, dtype=np.int32)
+
+        if self.source is not None:
+            self.source.callback = self._on_audio
+            self.stream = self.source
+        else:
+            # 콜백 블록 크기는 기록 여부와 관계없이 hop으로 고정
+            # (기록을 켜도 실시간 타이밍이 바뀌지 않고, 기록기는 청크 크기가 일정)
+            self.stream = sd.InputStream(device=self.device, samplerate=self.fs,
+                                         channels=2, dtype='int32',
+                                         blocksize=self.doa.hop_size,
+                                         callback=self._on_audio)
+        self.stream.start()
+        self._read_pos = self.ring.write_pos
+        self.doa.reset(self.ring.write_pos)
+        self.streaming = True
+
+    def stop_stream(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        self.streaming = False
+
+    def close(self):
+        """오디오 스트림과 IMU 샘플러 정지"""
+        self.stop_stream()
+        if self.imu is not None:
+            self.imu.stop()
+
+    def _on_audio(self, indata, frames, time_info, status):
+        """sounddevice 콜백 (오디오 스레드)"""
+        if status and status.input_overflow:
+            self.ring.overflows += 1
+        self.ring.write(indata)
+        if self.recorder is not None:
+            self.recorder.record_audio(indata)
+
+    def _read_block(self):
+        """분석할 2채널 블록 하나 읽기"""
+        if not self.streaming:
+            with sd.InputStream(device=self.device, samplerate=self.fs,
+                               channels=2, dtype='int32',
+                               blocksize=df.SAMPLES_PER_FRAME) as stream:
+                recording, _ = stream.read(df.SAMPLES_PER_FRAME)
+            self._block_time = time.monotonic() - df.SAMPLES_PER_FRAME / 2 / self.fs
+            if self.recorder is not None:
+                self.recorder.record_audio(recording)
+            return recording
+
+        # 새 프레임 분량이 쌓일 때까지 대기 후 최신 구간만 가져옴 (밀렸으면 건너뜀)
+        if not self.ring.wait_for(self._read_pos + df.SAMPLES_PER_FRAME):
+            return None
+        end = self.ring.write_pos
+        self._read_pos = end
+        self._block_time = self.ring.time_at(end - df.SAMPLES_PER_FRAME / 2, self.fs)
+        return self.ring.read(end, df.SAMPLES_PER_FRAME, out=self._window)
+
     def get_audio_data(self):
-        with sd.InputStream(device=self.device, samplerate=self.fs,
-                           channels=2, dtype='int32',
-                           blocksize=df.SAMPLES_PER_FRAME) as stream:
-            recording, _ = stream.read(df.SAMPLES_PER_FRAME)
+        recording = self._read_block()
+        if recording is None:
+            return None
 
-            rms_value, confidence = df.calculate_snr(recording)
+        # 블로킹 호출은 몇 초씩 떨어질 수 있으므로 실제 경과 시간으로 바닥 갱신
+        elapsed = df.SAMPLES_PER_FRAME / self.fs
+        if self._last_noise_time is not None:
+            elapsed = max(self._block_time - self._last_noise_time, elapsed)
+        self._last_noise_time = self._block_time
 
-            # RMS → SNR(dB) 변환
-            noise_level = 1000000
-            if rms_value > noise_level:
-                snr_db = 20 * np.log10(rms_value / noise_level)
-            else:
-                snr_db = 0.0
+        rms = frame_rms(recording)
+        snr, active = self.noise.update(rms[np.newaxis], elapsed)
+        snr_db = float(snr[0])
+
+        log.debug("    [DEBUG] RMS=%.0f, 소음=%.0f, SNR=%.1fdB", rms.mean(),
+                  self.noise.level, snr_db)
+
+        if not active[0]:
+            return None
 
-            snr_db = np.clip(snr_db, 0, 40)
+        _, confidence = df.calculate_snr(recording)
+        if confidence > 0.2:
+            tau = df.gcc_phat(recording[:, 0], recording[:, 1],
+                             self.fs, df.MAX_DELAY_SAMPLES)
+            raw_angle = df.estimate_direction(tau, self.fs,
+                                             df.C_SPEED, df.MIC_DISTANCE)
 
-            print(f"    [DEBUG] RMS={rms_value:.0f}, SNR={snr_db:.1f}dB, Conf={confidence:.2f}")
+            yaw = self._yaw_at(self._block_time)
+            return self._make_reading(raw_angle, yaw, snr_db, confidence,
+                                      self._block_time)
+        else:
+            return None
 
+    def get_audio_stream(self):
+        """새로 쌓인 hop마다 방위 추정 (스트리밍 모드 전용)
+
+        활성 프레임들의 GCC-PHAT를 한 번에 계산하고 시간순 리스트로 반환
+        """
+        if not self.ring.wait_for(self.doa.next_end):
+            return []
+        t0 = time.perf_counter()
+        frames, ends = self.doa.pull(self.ring)
+
+        # 채널별 RMS로 소음 바닥 대비 판정 → 활성 프레임만 신뢰도 계산
+        snrs, gate = self.noise.update(frame_rms(frames),
+                                       len(frames) * self.doa.hop_size / self.fs)
+        active = []
+        confidences = {}
+        for i in np.flatnonzero(gate):
+            _, confidence = df.calculate_snr(frames[i])
             if confidence > 0.2:
-                tau = df.gcc_phat(recording[:, 0], recording[:, 1],
-                                 self.fs, df.MAX_DELAY_SAMPLES)
-                raw_angle = df.estimate_direction(tau, self.fs,
-                                                 df.C_SPEED, df.MIC_DISTANCE)
-
-                self.tracker.update_yaw_combined()
-                corrected_angle = raw_angle + self.tracker.current_yaw
-
-                if corrected_angle > 180:
-                    corrected_angle -= 360
-                elif corrected_angle < -180:
-                    corrected_angle += 360
-
-                return {
-                    'angle': corrected_angle,
-                    'snr': snr_db,
-                    'confidence': confidence,
-                    'raw_angle': raw_angle
-                }
-            else:
-                return None
+                active.append(i)
+                confidences[i] = confidence
+
+        if not active:
+            if self.process_hist is not None:
+                self.process_hist.observe_since(t0)
+            return []
+
+        batch = frames if len(active) == len(frames) else frames[active]
+        taus = self.doa.estimate_delays(batch)
+
+        readings = []
+        for i, tau in zip(active, taus):
+            raw_angle = df.estimate_direction(tau, self.fs,
+                                             df.C_SPEED, df.MIC_DISTANCE)
+            snr_db, confidence = float(snrs[i]), confidences[i]
+            # 프레임 중간 시각의 yaw (회전 중에도 창 구간의 방향으로 보정)
+            mid_time = self.ring.time_at(ends[i] - df.SAMPLES_PER_FRAME / 2, self.fs)
+            yaw = self._yaw_at(mid_time)
+            readings.append(self._make_reading(raw_angle, yaw, snr_db, confidence,
+                                               mid_time))
+
+        if self.process_hist is not None:
+            self.process_hist.observe_since(t0)
+        return readings
+
+    def _yaw_at(self, timestamp):
+        if self.imu is not None:
+            return self.imu.yaw_at(timestamp)
+        return self._update_yaw()
+
+    def _update_yaw(self):
+        self.tracker.update_yaw_combined()
+        yaw = self.tracker.current_yaw
+        if self.recorder is not None:
+            self.recorder.record_yaw(yaw)
+        return yaw
+
+    @staticmethod
+    def _make_reading(raw_angle, yaw, snr_db, confidence, timestamp):
+        corrected_angle = raw_angle + yaw
+
+        if corrected_angle > 180:
+            corrected_angle -= 360
+        elif corrected_angle < -180:
+            corrected_angle += 360
+
+        return {
+            'angle': corrected_angle,
+            'snr': snr_db,
+            'confidence': confidence,
+            'raw_angle': raw_angle,
+            'time': timestamp   # 분석 창 중간 시각 (monotonic)
+        }
 
 
 class CameraSensorWrapper:
-    def __init__(self, stream_url=0):
-        self.cap = cv2.VideoCapture(stream_url)
+    DETECTORS = ('contour', 'projection')
+
+    def __init__(self, stream_url=0, detector='contour', projection_scale=1.0,
+                 threaded=False, capture=None, recorder=None):
+        # 잘못된 설정이면 카메라를 열거나 프레임 스레드를 띄우기 전에 실패
+        if detector not in self.DETECTORS:
+            raise ValueError(f"❌ 알 수 없는 탐지 방식: {detector}")
+
+        # capture: cv2.VideoCapture 대신 쓸 캡처 객체 (재생용)
+        self.cap = capture if capture is not None else cv2.VideoCapture(stream_url)
+        self.recorder = recorder
         if not self.cap.isOpened():
             raise ValueError(f"❌ 카메라 열기 실패: {stream_url}")
 
+        # threaded: 백그라운드 스레드가 최신 프레임만 유지 (오래된 프레임 방지)
+        self.grabber = None
+        if threaded:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            self.grabber = FrameGrabber(self.cap).start()
+
+        # 마지막으로 읽은 프레임의 캡처 시각(monotonic)과 번호
+        self.frame_time = 0.0
+        self.frame_seq = 0
+
         self.roi_top_ratio = 0.6
         self.min_gap_width = 50
         self.threshold = 50
-        print(f"✅ 카메라 초기화 (ROI: 하단 40%, 최소폭: {self.min_gap_width}px)")
+
+        # 탐지 방식: 'contour' (윤곽선) | 'projection' (열 점유율 투영)
+        self.detector = detector
+        self.projection_scale = projection_scale  # 투영 방식 ROI 축소 비율
+        self.occupancy_ratio = 0.5                # 열의 이 비율 이상이 어두우면 틈
+
+        # 모폴로지 커널과 해상도별 작업 버퍼 (설정/해상도가 바뀔 때만 재생성)
+        self.kernel_size = 5
+        self._kernel = None
+        self._kernel_size = None
+        self._buffers = None
+        self._buffers_key = None
+        print(f"✅ 카메라 초기화 (ROI: 하단 40%, 최소폭: {self.min_gap_width}px, "
+              f"탐지: {detector})")
+
+    def read_frame(self, timeout=1.0):
+        """프레임 한 장 읽기 (실패 시 None)
+
+        threaded 모드에서는 아직 안 읽은 최신 프레임을 기다려 가져온다
+        """
+        if self.grabber is not None:
+            item = self.grabber.wait_newer(self.frame_seq, timeout)
+            if item is None:
+                return None
+            frame, self.frame_time, self.frame_seq = item
+        else:
+            ret, frame = self.cap.read()
+            if not ret:
+                return None
+            self.frame_time = time.monotonic()
+            self.frame_seq += 1
+
+        if self.recorder is not None:
+            self.recorder.record_frame(frame, self.frame_time)
+        return frame
+
+    def release(self):
+        if self.grabber is not None:
+            self.grabber.stop()
+        self.cap.release()
 
     def get_gaps_with_angles(self):
-        ret, frame = self.cap.read()
-        if not ret:
+        frame = self.read_frame()
+        if frame is None:
             return None, None, None
 
+        gaps, debug_info = self.detect_gaps(frame)
+        return gaps, frame, debug_info
+
+    def detect_gaps(self, frame, timestamp=None):
+        """이미 디코딩된 프레임에서 틈 탐지 → (gaps, debug_info)
+
+        timestamp: 프레임 캡처 시각 (기본: 마지막으로 읽은 프레임의 frame_time)
+        """
         h, w, _ = frame.shape
         roi_top = int(h * self.roi_top_ratio)
         roi_bottom = h
 
         # ROI 추출 및 이진화
         roi = frame[roi_top:roi_bottom, :]
-        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (5, 5), 0)
-        _, binary = cv2.threshold(blur, self.threshold, 255, cv2.THRESH_BINARY_INV)
+        scale = self.projection_scale if self.detector == 'projection' else 1.0
+        binary = self._binarize(roi, scale)
+
+        if self.detector == 'projection':
+            starts, widths, candidates = self._find_spans_projection(binary, scale)
+        else:
+            starts, widths, candidates = self._find_spans_contour(binary)
+
+        gaps = GapBatch.from_spans(starts, widths, w,
+                                   timestamp if timestamp is not None else self.frame_time or None)
+
+        debug_info = {
+            'roi_top': roi_top,
+            'roi_bottom': roi_bottom,
+            'contours': candidates,
+            'detector': self.detector
+        }
+
+        return gaps, debug_info
+
+    def _get_kernel(self):
+        if self._kernel_size != self.kernel_size:
+            self._kernel = cv2.getStructuringElement(
+                cv2.MORPH_RECT, (self.kernel_size, self.kernel_size))
+            self._kernel_size = self.kernel_size
+        return self._kernel
+
+    def _get_buffers(self, roi_h, roi_w, scale):
+        """ROI 크기·축소 비율별 작업 버퍼 (스트림 해상도가 바뀌면 재할당)"""
+        key = (roi_h, roi_w, scale)
+        if key != self._buffers_key:
+            if scale != 1.0:
+                size = (max(1, round(roi_h * scale)), max(1, round(roi_w * scale)))
+            else:
+                size = (roi_h, roi_w)
+
+            self._buffers = {
+                'gray': np.empty((roi_h, roi_w), dtype=np.uint8),
+                'small': np.empty(size, dtype=np.uint8) if scale != 1.0 else None,
+                'blur': np.empty(size, dtype=np.uint8),
+                'binary': np.empty(size, dtype=np.uint8),
+                'closed': np.empty(size, dtype=np.uint8)
+            }
+            self._buffers_key = key
+        return self._buffers
+
+    def _binarize(self, roi, scale=1.0):
+        """ROI → 이진 영상 (어두운 영역 = 255), 결과는 재사용 버퍼"""
+        roi_h, roi_w = roi.shape[:2]
+        buf = self._get_buffers(roi_h, roi_w, scale)
+
+        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY, dst=buf['gray'])
+        if scale != 1.0:
+            small = buf['small']
+            gray = cv2.resize(gray, (small.shape[1], small.shape[0]), dst=small,
+                              interpolation=cv2.INTER_AREA)
+
+        blur = cv2.GaussianBlur(gray, (5, 5), 0, dst=buf['blur'])
+        _, binary = cv2.threshold(blur, self.threshold, 255, cv2.THRESH_BINARY_INV,
+                                  dst=buf['binary'])
 
         # 노이즈 제거
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-        binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+        return cv2.morphologyEx(binary, cv2.MORPH_CLOSE, self._get_kernel(),
+                                dst=buf['closed'])
 
-        # 윤곽선 탐지
+    def _find_spans_contour(self, binary):
+        """윤곽선 외접 사각형의 가로 구간"""
         contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL,
                                        cv2.CHAIN_APPROX_SIMPLE)
 
-        # 틈 필터링
-        gaps = []
+        # 틈 필터링 (가로 구간만 모아 한 번에 변환)
+        starts = []
+        widths = []
         for cnt in contours:
             x, y, cnt_w, cnt_h = cv2.boundingRect(cnt)
 
             if cnt_w >= self.min_gap_width:
-                center_x = x + cnt_w / 2
-                angle = (center_x - w / 2) / w * 60
-
-                gaps.append({
-                    'start': x,
-                    'end': x + cnt_w,
-                    'center': center_x,
-                    'width': cnt_w,
-                    'angle': angle,
-                    'confidence': min(1.0, cnt_w / 300.0)
-                })
+                starts.append(x)
+                widths.append(cnt_w)
 
-        debug_info = {
-            'roi_top': roi_top,
-            'roi_bottom': roi_bottom,
-            'contours': len(contours)
-        }
+        return starts, widths, len(contours)
 
-        return gaps, frame, debug_info
+    def _find_spans_projection(self, binary, scale=1.0):
+        """열 점유율 1차원 투영 → 연속 구간(run) 추출"""
+        occupancy = np.count_nonzero(binary, axis=0) / binary.shape[0]
+        is_gap = occupancy >= self.occupancy_ratio
+
+        # 양끝을 False로 감싸고 변화 지점 = run 시작/끝
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], is_gap, [False]))))
+        run_starts = edges[0::2] / scale
+        run_widths = (edges[1::2] - edges[0::2]) / scale
+
+        keep = run_widths >= self.min_gap_width
+        return run_starts[keep], run_widths[keep], len(run_starts)
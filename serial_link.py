@@ -0,0 +1,289 @@
+# fusion/serial_link.py
+#
+# 라즈베리파이 ↔ 아두이노 모터 명령 링크 (asyncio)
+#
+# 프레임: START(0xAA) | TYPE | SEQ | LEN | PAYLOAD(LEN) | CRC8(TYPE..PAYLOAD)
+#   FRAME_CMD (Pi → 아두이노): PAYLOAD = 명령 문자(F/B/L/R/S), 속도(PWM 0~255, 0=기본값)
+#   FRAME_ACK (아두이노 → Pi): PAYLOAD = 받은 SEQ, 실제 적용한 명령 문자
+#   FRAME_TELEMETRY (아두이노 → Pi): PAYLOAD = 거리(cm, u16 LE), 현재 명령 문자, 플래그
+# 프레임 밖의 F/B/L/R/S 한 바이트는 아두이노가 예전 방식 그대로 처리한다.
+# 아두이노는 프레임 주행 명령 뒤 300ms 동안 새 명령 프레임이 없으면 정지하므로
+# (명령 워치독) 주행 중에는 그보다 자주 명령을 보내야 한다.
+
+import time
+import asyncio
+import logging
+import threading
+import serial
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PORT = '/dev/ttyUSB0'
+DEFAULT_BAUD = 115200
+
+FRAME_START = 0xAA
+FRAME_CMD = 0x01
+FRAME_ACK = 0x81
+FRAME_TELEMETRY = 0x82
+MAX_PAYLOAD = 32
+
+COMMANDS = ('F', 'B', 'L', 'R', 'S')
+
+
+def _make_crc8_table(poly=0x07):
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+
+_CRC8_TABLE = _make_crc8_table()
+
+
+def crc8(data):
+    """CRC-8 (다항식 0x07, 초기값 0) - 스케치의 crc8()과 동일"""
+    crc = 0
+    for b in data:
+        crc = _CRC8_TABLE[crc ^ b]
+    return crc
+
+
+def encode_frame(ftype, seq, payload=b''):
+    body = bytes((ftype, seq & 0xFF, len(payload))) + bytes(payload)
+    return bytes((FRAME_START,)) + body + bytes((crc8(body),))
+
+
+class FrameParser:
+    """바이트 스트림 → (type, seq, payload) 프레임 (CRC가 틀리면 버리고 재동기)"""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self.errors = 0
+
+    def feed(self, data):
+        buf = self._buf
+        buf.extend(data)
+        frames = []
+
+        while True:
+            start = buf.find(FRAME_START)
+            if start < 0:
+                buf.clear()
+                break
+            if start > 0:
+                del buf[:start]   # 프레임 밖 바이트 (디버그 출력 등)
+            if len(buf) < 4:
+                break
+
+            length = buf[3]
+            if length > MAX_PAYLOAD:
+                self.errors += 1
+                del buf[0]
+                continue
+            end = 4 + length
+            if len(buf) < end + 1:
+                break
+
+            body = bytes(buf[1:end])
+            if crc8(body) != buf[end]:
+                self.errors += 1
+                del buf[0]
+                continue
+
+            frames.append((body[0], body[1], body[3:]))
+            del buf[:end + 1]
+
+        return frames
+
+
+class MotorLink:
+    """비동기 모터 명령 링크
+
+    send()는 최신 명령만 남기고 바로 돌아온다. 전용 writer 태스크가 최신 명령을
+    프레임으로 보내고 ACK를 기다리며, 기다리는 동안 새 명령이 오면 이전 명령은
+    버리고(coalescing) 새 명령을 보낸다. ACK가 없으면 max_retries번 재전송.
+    수신은 이벤트 루프의 reader 콜백에서 논블로킹으로 처리한다.
+    """
+
+    def __init__(self, port=DEFAULT_PORT, baudrate=DEFAULT_BAUD, ack_timeout=0.05,
+                 max_retries=3, reset_delay=2.0, ack_hist=None):
+        self.port = port
+        self.baudrate = baudrate
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self.reset_delay = reset_delay    # 포트를 열면 아두이노가 리셋됨
+        self.ack_hist = ack_hist          # 명령 → ACK 왕복 지연 히스토그램 (선택)
+
+        self.ser = None
+        self.parser = FrameParser()
+        self.handlers = {}                # 프레임 종류 → 콜백(seq, payload)
+
+        self.sent = 0          # 보낸 명령 프레임 (재전송 포함)
+        self.acked = 0
+        self.retries = 0
+        self.failed = 0        # 재전송까지 ACK 없음
+        self.coalesced = 0     # 보내기 전에 새 명령으로 대체된 명령
+        self.last_applied = None   # 아두이노가 마지막으로 적용한 명령
+        self.write_delay = None    # send() → 프레임 쓰기 (초)
+        self.command_latency = None   # send() → 그 명령의 ACK (초, 재전송 포함)
+
+        self._loop = None
+        self._seq = 0
+        self._latest = None
+        self._latest_time = 0.0
+        self._latest_sent = False
+        self._wake = None
+        self._signal = None
+        self._acked_seq = None
+        self._writer_task = None
+
+    async def open(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._signal = asyncio.Event()
+
+        self.ser = serial.Serial(self.port, self.baudrate, timeout=0)
+        await asyncio.sleep(self.reset_delay)
+        self.ser.reset_input_buffer()
+
+        self._loop.add_reader(self.ser.fileno(), self._on_readable)
+        self._writer_task = asyncio.create_task(self._writer())
+        log.info("시리얼 링크 연결: %s @ %d", self.port, self.baudrate)
+
+    async def close(self, stop=True):
+        """(기본) 정지 명령을 보낸 뒤 포트 닫기"""
+        if self.ser is None:
+            return
+        if stop:
+            self.ser.write(encode_frame(FRAME_CMD, self._next_seq(), b'S\x00'))
+            self.ser.flush()
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        self._loop.remove_reader(self.ser.fileno())
+        self.ser.close()
+        self.ser = None
+
+    def send(self, command, speed=0):
+        """최신 명령 등록 (이벤트 루프 스레드에서 호출, 막히지 않음)"""
+        if command not in COMMANDS:
+            raise ValueError(f"알 수 없는 명령: {command!r}")
+        if self._latest is not None and not self._latest_sent:
+            self.coalesced += 1
+        self._latest = (command, speed)
+        self._latest_time = time.perf_counter()
+        self._latest_sent = False
+        self._wake.set()
+        self._signal.set()
+
+    def on_frame(self, ftype, handler):
+        """ACK 이외 프레임 수신 콜백 등록 handler(seq, payload)"""
+        self.handlers[ftype] = handler
+
+    def _next_seq(self):
+        self._seq = (self._seq + 1) & 0xFF
+        return self._seq
+
+    async def _writer(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            command, speed = self._latest
+            requested = self._latest_time
+            self._latest_sent = True
+            payload = bytes((ord(command), speed & 0xFF))
+
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    self.retries += 1
+                seq = self._next_seq()
+                t0 = time.perf_counter()
+                self.ser.write(encode_frame(FRAME_CMD, seq, payload))
+                self.sent += 1
+                if not attempt:
+                    self.write_delay = time.perf_counter() - requested
+
+                if await self._wait_ack(seq):
+                    self.command_latency = time.perf_counter() - requested
+                    if self.ack_hist is not None:
+                        self.ack_hist.observe_since(t0)
+                    break
+                if self._wake.is_set():
+                    break   # 더 새 명령이 왔으므로 재전송하지 않음
+            else:
+                self.failed += 1
+                log.warning("명령 %s ACK 없음 (%d회 전송)", command, self.max_retries + 1)
+
+    async def _wait_ack(self, seq):
+        """seq의 ACK를 받으면 True, 시간 초과나 새 명령이면 False"""
+        deadline = self._loop.time() + self.ack_timeout
+        while True:
+            if self._acked_seq == seq:
+                return True
+            if self._wake.is_set():
+                return False
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                return False
+            self._signal.clear()
+            try:
+                await asyncio.wait_for(self._signal.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    def _on_readable(self):
+        try:
+            data = self.ser.read(self.ser.in_waiting or 1)
+        except serial.SerialException:
+            log.exception("시리얼 읽기 오류")
+            return
+        for ftype, seq, payload in self.parser.feed(data):
+            if ftype == FRAME_ACK and len(payload) >= 2:
+                self._acked_seq = payload[0]
+                self.last_applied = chr(payload[1])
+                self.acked += 1
+                self._signal.set()
+            else:
+                handler = self.handlers.get(ftype)
+                if handler is not None:
+                    handler(seq, payload)
+
+
+class MotorLinkThread:
+    """스레드 기반 코드용 래퍼 (전용 이벤트 루프 스레드에서 MotorLink 실행)"""
+
+    def __init__(self, *args, **kwargs):
+        self.link = MotorLink(*args, **kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def start(self, timeout=5.0):
+        self._thread.start()
+        future = asyncio.run_coroutine_threadsafe(self.link.open(), self._loop)
+        future.result(timeout=self.link.reset_delay + timeout)
+        return self
+
+    def send(self, command, speed=0):
+        """아무 스레드에서나 호출 가능"""
+        self._loop.call_soon_threadsafe(self.link.send, command, speed)
+
+    def on_frame(self, ftype, handler):
+        """handler는 링크 스레드에서 호출됨"""
+        self.link.on_frame(ftype, handler)
+
+    def stop(self, timeout=2.0):
+        if not self._thread.is_alive():
+            return
+        future = asyncio.run_coroutine_threadsafe(self.link.close(), self._loop)
+        try:
+            future.result(timeout=timeout)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=timeout)
@@ -0,0 +1,136 @@
+# fusion/shm_ring.py
+#
+# 프로세스 간 공유 메모리 전송 (이미지 pickle 없음)
+#
+# 부모 프로세스가 만들고 fork된 자식 프로세스가 그대로 물려받아 쓴다.
+# 쓰는 쪽은 항상 하나(단일 생산자)이고, 슬롯/레코드별 seq로 찢어진 읽기를 걸러낸다.
+#
+# numpy 대입에는 메모리 배리어가 없어서 ARM(라즈베리파이)에서는 다른 코어가
+# seq와 데이터 쓰기를 다른 순서로 볼 수 있다. 그래서 seq 갱신/확인은 프로세스
+# 간 Lock 안에서 한다 (POSIX 세마포어 획득/해제가 메모리 동기화 지점).
+# Lock도 부모가 만들어 fork로 물려준다.
+
+import time
+import multiprocessing as mp
+import numpy as np
+import cv2
+from multiprocessing import shared_memory
+
+
+class SharedFrameRing:
+    """공유 메모리 프레임 링 (고정 해상도 슬롯 N개)
+
+    메모리 배치: 헤더(int64: 최신 seq) | 슬롯 seq(int64 × N) | 슬롯 시각(float64 × N)
+                 | 프레임(uint8 × N × H × W × C)
+
+    프레임 복사는 Lock 밖에서 하고, 복사 앞뒤의 seq 갱신/확인만 Lock으로 감싼다.
+    """
+
+    def __init__(self, shape, slots=4):
+        self.shape = tuple(shape)
+        self.slots = slots
+
+        frame_bytes = int(np.prod(self.shape))
+        header_bytes = 8 * (1 + 2 * slots)
+        self.shm = shared_memory.SharedMemory(create=True,
+                                              size=header_bytes + slots * frame_bytes)
+        buf = self.shm.buf
+
+        self._latest = np.ndarray((1,), dtype=np.int64, buffer=buf, offset=0)
+        self._slot_seq = np.ndarray((slots,), dtype=np.int64, buffer=buf, offset=8)
+        self._slot_time = np.ndarray((slots,), dtype=np.float64, buffer=buf,
+                                     offset=8 * (1 + slots))
+        self._frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=buf,
+                                  offset=header_bytes)
+
+        self._latest[0] = 0
+        self._slot_seq[:] = 0
+        self._fence = mp.Lock()
+
+    @property
+    def latest_seq(self):
+        return int(self._latest[0])
+
+    def write(self, frame, timestamp=None):
+        """프레임을 다음 슬롯에 기록 (해상도가 다르면 슬롯 크기로 축소/확대)"""
+        seq = self.latest_seq + 1
+        slot = seq % self.slots
+
+        with self._fence:
+            self._slot_seq[slot] = -1   # 쓰는 중
+        dst = self._frames[slot]
+        if frame.shape == self.shape:
+            np.copyto(dst, frame)
+        else:
+            cv2.resize(frame, (self.shape[1], self.shape[0]), dst=dst)
+        with self._fence:
+            self._slot_time[slot] = timestamp if timestamp is not None else time.monotonic()
+            self._slot_seq[slot] = seq
+            self._latest[0] = seq
+        return seq
+
+    def read(self, out, after_seq=0):
+        """after_seq보다 새 최신 프레임을 out에 복사 → (seq, timestamp) 또는 None"""
+        with self._fence:
+            seq = self.latest_seq
+            if seq <= after_seq:
+                return None
+            slot = seq % self.slots
+            if self._slot_seq[slot] != seq:
+                return None
+            timestamp = float(self._slot_time[slot])
+        np.copyto(out, self._frames[slot])
+
+        # 복사하는 동안 덮어써졌으면 버림
+        with self._fence:
+            if self._slot_seq[slot] != seq:
+                return None
+        return seq, timestamp
+
+    def close(self, unlink=False):
+        self._latest = self._slot_seq = self._slot_time = self._frames = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class SharedRecord:
+    """공유 메모리 고정 레이아웃 레코드 (float64 필드)
+
+    필드 몇 개뿐이라 읽기/쓰기 전체를 Lock 안에서 한다 (찢어진 읽기나 재시도 없음).
+    seq는 쓰기 횟수로, 잠그지 않고 새 값 여부를 가늠하는 데 쓴다.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.shm = shared_memory.SharedMemory(create=True, size=8 * (1 + len(self.fields)))
+        self._data = np.ndarray((1 + len(self.fields),), dtype=np.float64,
+                                buffer=self.shm.buf)
+        self._data[:] = 0.0
+        self._lock = mp.Lock()
+
+    @property
+    def seq(self):
+        return int(self._data[0])
+
+    def write(self, values):
+        """values: 필드 이름 → 값 (없는 필드는 NaN)"""
+        row = [values.get(field, np.nan) for field in self.fields]
+        with self._lock:
+            self._data[1:] = row
+            self._data[0] += 1
+
+    def read(self):
+        """일관된 스냅샷 dict (아직 기록이 없으면 None, 없는 필드는 None)"""
+        with self._lock:
+            if self._data[0] == 0:
+                return None
+            values = self._data[1:].tolist()
+        # NaN은 JSON으로 내보낼 수 없으므로 None으로 (/status jsonify)
+        return {field: (None if v != v else v) for field, v in zip(self.fields, values)}
+
+    def close(self, unlink=False):
+        self._data = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
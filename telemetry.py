@@ -0,0 +1,87 @@
+# fusion/telemetry.py
+
+import time
+import struct
+import numpy as np
+
+# FRAME_TELEMETRY 페이로드: 거리(cm, u16 LE), 현재 명령 문자, 플래그
+TELEMETRY_FORMAT = '<HBB'
+TELEMETRY_SIZE = struct.calcsize(TELEMETRY_FORMAT)
+
+FLAG_OBSTACLE = 0x01    # 거리 < 펌웨어 DISTANCE_THRESHOLD
+FLAG_HARD_STOP = 0x02   # 이번 주기에 펌웨어가 직접 정지시킴
+FLAG_WATCHDOG = 0x04    # 이번 주기에 펌웨어 명령 워치독이 정지시킴 (명령 끊김)
+
+NO_ECHO_CM = 999        # 스케치가 측정 실패 시 보내는 값
+
+
+class DistanceRing:
+    """초음파 거리 텔레메트리 링 버퍼 (단일 생산자, 락 없음)
+
+    시리얼 링크의 수신 콜백이 on_frame()으로 기록하고, 융합/제어 스레드는
+    latest()나 window()로 읽기만 한다. count는 데이터를 쓴 뒤에 증가한다.
+    """
+
+    def __init__(self, capacity=256):
+        self.times = np.zeros(capacity, dtype=np.float64)      # 수신 시각 (monotonic)
+        self.distances = np.zeros(capacity, dtype=np.float64)  # cm
+        self.flags = np.zeros(capacity, dtype=np.uint8)
+        self.status = 'S'     # 아두이노의 현재 명령
+        self.count = 0
+        self.dropped = 0      # 시퀀스 번호로 확인한 누락 프레임
+        self.hard_stops = 0
+        self.watchdog_stops = 0
+
+        self._last_seq = None
+
+    def on_frame(self, seq, payload):
+        """MotorLink.on_frame(FRAME_TELEMETRY, ring.on_frame)용 콜백"""
+        if len(payload) < TELEMETRY_SIZE:
+            return
+        distance, status, flags = struct.unpack_from(TELEMETRY_FORMAT, payload)
+
+        if self._last_seq is not None:
+            self.dropped += (seq - self._last_seq - 1) & 0xFF
+        self._last_seq = seq
+
+        self.append(time.monotonic(), distance, chr(status), flags)
+
+    def append(self, timestamp, distance, status='S', flags=0):
+        i = self.count % len(self.times)
+        self.times[i] = timestamp
+        self.distances[i] = distance
+        self.flags[i] = flags
+        self.status = status
+        if flags & FLAG_HARD_STOP:
+            self.hard_stops += 1
+        if flags & FLAG_WATCHDOG:
+            self.watchdog_stops += 1
+        self.count += 1
+
+    def latest(self):
+        """가장 최근 측정 {'distance', 'time', 'obstacle', 'hard_stop', 'watchdog', 'status'} 또는 None"""
+        count = self.count
+        if count == 0:
+            return None
+        i = (count - 1) % len(self.times)
+        flags = int(self.flags[i])
+        return {
+            'distance': float(self.distances[i]),
+            'time': float(self.times[i]),
+            'obstacle': bool(flags & FLAG_OBSTACLE),
+            'hard_stop': bool(flags & FLAG_HARD_STOP),
+            'watchdog': bool(flags & FLAG_WATCHDOG),
+            'status': self.status
+        }
+
+    def window(self, seconds, now=None):
+        """최근 seconds초 동안의 (시각, 거리) 배열 (오래된 순)"""
+        if now is None:
+            now = time.monotonic()
+        count = self.count
+        size = len(self.times)
+        k = min(count, size - 1)   # 읽는 동안 덮어쓸 수 있는 칸 제외
+        idx = np.arange(count - k, count) % size
+        times = self.times[idx]
+        keep = times >= now - seconds
+        return times[keep], self.distances[idx][keep]
@@ -0,0 +1,134 @@
+# fusion/visualize.py
+#
+# 서버 공통 시각화와 탐지 설정 (main_fusion_fast, main_fusion_mp가 함께 사용)
+
+import cv2
+import numpy as np
+
+# 틈 탐지 방식: 'contour' | 'projection' (+ 투영 방식 ROI 축소 비율)
+GAP_DETECTOR = 'contour'
+PROJECTION_SCALE = 0.5
+
+# 카메라 루프 목표 FPS (탐지 주기는 측정 비용에 맞춰 자동 조절)
+TARGET_FPS = 15.0
+
+
+class RenderBuffers:
+    """시각화 출력 버퍼 재사용 (스트림 해상도 기준)
+
+    방송 허브는 publish() 때 프레임을 복사하므로 출력 버퍼 한 장을 매 프레임
+    다시 써도 된다. 출력을 다른 스레드에 참조로 넘기는 경우에만 slots를 늘린다.
+    """
+
+    def __init__(self, slots=1):
+        self.slots = slots
+        self._shape = None
+        self._frames = []
+        self._overlay = None
+        self._index = 0
+
+    def next(self, shape):
+        """다음 출력 버퍼와 오버레이 버퍼 (해상도가 바뀌면 재할당)"""
+        if shape != self._shape:
+            self._shape = shape
+            self._frames = [np.empty(shape, dtype=np.uint8) for _ in range(self.slots)]
+            self._overlay = np.empty(shape, dtype=np.uint8)
+
+        self._index = (self._index + 1) % self.slots
+        return self._frames[self._index], self._overlay
+
+
+render_buffers = RenderBuffers()
+
+
+def visualize_fast(frame, gaps, result, audio_data, debug_info):
+    """최적화된 시각화 (간단하게!)
+
+    미리 할당된 버퍼에 그리고, 반투명 합성은 ROI 구간에서만 제자리로 수행
+    """
+    vis, overlay = render_buffers.next(frame.shape)
+    np.copyto(vis, frame)
+    h, w, _ = vis.shape
+
+    roi_top = debug_info['roi_top'] if debug_info else int(h * 0.6)
+    roi_bottom = h
+    # === 1. 틈 시각화 ===
+    if gaps:
+        vis_roi = vis[roi_top:roi_bottom]
+        overlay_roi = overlay[roi_top:roi_bottom]
+        np.copyto(overlay_roi, vis_roi)
+
+        styles = []
+        for i, gap in enumerate(gaps):
+            is_best = (result is not None and i == result['best_index'])
+
+            if is_best:
+                color = (0, 255, 0)      # 초록
+                thickness = 6
+            elif i == 1:
+                color = (0, 165, 255)    # 주황
+                thickness = 4
+            else:
+                color = (255, 200, 0)    # 하늘색
+                thickness = 2
+            styles.append((color, thickness))
+
+            # 채우기 (ROI 좌표계)
+            cv2.rectangle(overlay_roi,
+                         (int(gap.start), 0),
+                         (int(gap.end), roi_bottom - roi_top),
+                         color, -1)
+
+        # 반투명 효과 (ROI만, 제자리 합성)
+        cv2.addWeighted(vis_roi, 0.5, overlay_roi, 0.5, 0, dst=vis_roi)
+
+        for i, gap in enumerate(gaps):
+            color, thickness = styles[i]
+
+            # 테두리
+            cv2.rectangle(vis,
+                         (int(gap.start), roi_top),
+                         (int(gap.end), roi_bottom),
+                         color, thickness)
+
+            # 순위 번호
+            rank_text = f"#{i+1}"
+            cv2.putText(vis, rank_text,
+                       (int(gap.center) - 20, roi_top - 30),
+                       cv2.FONT_HERSHEY_SIMPLEX, 1.0, color, 3)
+
+    # === 2. ROI 경계선 ===
+    cv2.line(vis, (0, roi_top), (w, roi_top), (0, 255, 255), 2)
+    cv2.putText(vis, "ROI", (10, roi_top - 10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+    # === 3. 상태 정보 ===
+    cv2.rectangle(vis, (5, 5), (450, 100), (0, 0, 0), -1)
+    cv2.rectangle(vis, (5, 5), (450, 100), (255, 255, 255), 2)
+
+    if gaps:
+        best_gap = result['best_gap'] if result else gaps[0]
+        gap_text = f"Best: {best_gap.angle:+.1f}deg ({best_gap.width:.0f}px)"
+        cv2.putText(vis, gap_text, (15, 35),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+    else:
+        cv2.putText(vis, "NO GAP DETECTED", (15, 35),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+
+    if audio_data:
+        mode = result['mode'] if result else "N/A"
+        if mode == 'audio_trust':
+            mode_text = "AUDIO"
+        elif mode == 'visual_only':
+            mode_text = "VISUAL(stale audio)"
+        else:
+            mode_text = "VISUAL"
+        audio_text = f"{mode_text} | {audio_data['angle']:+.1f}deg | SNR:{audio_data['snr']:.1f}dB"
+        color = (0, 255, 0) if audio_data['snr'] > 10 else (0, 165, 255)
+        cv2.putText(vis, audio_text, (15, 70),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    else:
+        cv2.putText(vis, "No Audio", (15, 70),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (128, 128, 128), 2)
+
+    return vis